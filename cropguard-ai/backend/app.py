@@ -2,27 +2,49 @@ from flask import Flask
 from flask_cors import CORS
 import os
 import sys
+import time
 
 # Fix import path for Render deployment
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from config import get_config
+
+# "api" serves auth, farms, alerts and reports only and never imports the
+# ML stack (TensorFlow, numpy, PIL); "full" also serves /api/predict
+APP_MODE = get_config()["APP_MODE"]
+ML_ENABLED = APP_MODE != "api"
+
 # Import blueprints
 from controllers.user_controller import user_bp
-from controllers.predict_controller import predict_bp
 from controllers.farm_controller import farm_bp
 from controllers.alerts_controller import alerts_bp
 from controllers.admin_controller import admin_bp
+from controllers.jobs_controller import jobs_bp
+from models.repository import get_repository
+if ML_ENABLED:
+    from controllers.predict_controller import predict_bp
+    from services.ai_service import start_warmup, readiness
 
 app = Flask(__name__)
 CORS(app)
 
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix="/api/user")
-app.register_blueprint(predict_bp, url_prefix="/api")
+if ML_ENABLED:
+    app.register_blueprint(predict_bp, url_prefix="/api")
 app.register_blueprint(farm_bp, url_prefix="/api")
 app.register_blueprint(alerts_bp, url_prefix="/api")
+app.register_blueprint(jobs_bp, url_prefix="/api")
 app.register_blueprint(admin_bp, url_prefix="/api/admin")
 
+# Pick the storage backend (MongoDB or local) once at startup
+print(f"Storage backend: {get_repository().name} (mode: {APP_MODE})")
+
+# Load and warm the model in the background; /health/ready reports progress
+STARTED_AT = time.time()
+if ML_ENABLED and get_config()["MODEL_EAGER_LOAD"]:
+    start_warmup()
+
 @app.route("/")
 def home():
     return {"status": "CropGuard AI Backend Running", "version": "1.0"}
@@ -31,6 +53,17 @@ def home():
 def health():
     return {"status": "healthy"}
 
+@app.route("/health/live")
+def health_live():
+    return {"status": "alive", "uptime_s": round(time.time() - STARTED_AT, 1)}
+
+@app.route("/health/ready")
+def health_ready():
+    status = readiness() if ML_ENABLED else {"ready": True, "phase": "ready", "backend": None}
+    status["mode"] = APP_MODE
+    status["storage_backend"] = get_repository().name
+    return status, (200 if status["ready"] else 503)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -1,9 +1,77 @@
 import os
 
 def get_config():
+    root = os.path.dirname(os.path.dirname(__file__))
+    storage = os.environ.get("STORAGE_PATH", os.path.join(root, "storage"))
     return {
         "MONGODB_URI": os.environ.get("MONGODB_URI", "mongodb://localhost:27017/cropguard"),
-        "MODEL_PATH": os.environ.get("MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "model", "crop_disease_model.h5")),
-        "STORAGE_PATH": os.environ.get("STORAGE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage")),
-        "PORT": os.environ.get("PORT", "5000")
+        "MODEL_PATH": os.environ.get("MODEL_PATH", os.path.join(root, "model", "crop_disease_model.h5")),
+        "STORAGE_PATH": storage,
+        "PORT": os.environ.get("PORT", "5000"),
+        # full | api (auth/farms/alerts/reports without the ML stack)
+        "APP_MODE": os.environ.get("APP_MODE", "full"),
+        "INFER_BATCH_SIZE": int(os.environ.get("INFER_BATCH_SIZE", "16")),
+        "INFER_BATCH_WAIT_MS": float(os.environ.get("INFER_BATCH_WAIT_MS", "5")),
+        "STORAGE_FSYNC_BATCH": int(os.environ.get("STORAGE_FSYNC_BATCH", "32")),
+        "STORAGE_FSYNC_INTERVAL_MS": float(os.environ.get("STORAGE_FSYNC_INTERVAL_MS", "1000")),
+        "STORAGE_BACKEND": os.environ.get("STORAGE_BACKEND", "mongo" if "MONGODB_URI" in os.environ else "sqlite"),
+        "SQLITE_PATH": os.environ.get("SQLITE_PATH", os.path.join(storage, "cropguard.db")),
+        "MONGO_MAX_POOL_SIZE": int(os.environ.get("MONGO_MAX_POOL_SIZE", "50")),
+        "MONGO_MIN_POOL_SIZE": int(os.environ.get("MONGO_MIN_POOL_SIZE", "2")),
+        "REPORT_ROLLUPS": os.environ.get("REPORT_ROLLUPS", "daily,weekly"),
+        "ALERTS_PAGE_SIZE": int(os.environ.get("ALERTS_PAGE_SIZE", "50")),
+        "ALERTS_MAX_PAGE_SIZE": int(os.environ.get("ALERTS_MAX_PAGE_SIZE", "500")),
+        # Alerts from /api/predict are written in batches by a background thread
+        "ALERT_PIPELINE": os.environ.get("ALERT_PIPELINE", "1").lower() not in ("0", "false", "no"),
+        "ALERT_QUEUE_SIZE": int(os.environ.get("ALERT_QUEUE_SIZE", "1000")),
+        "ALERT_BATCH_SIZE": int(os.environ.get("ALERT_BATCH_SIZE", "100")),
+        "ALERT_BATCH_WAIT_MS": float(os.environ.get("ALERT_BATCH_WAIT_MS", "50")),
+        "ALERT_ENQUEUE_TIMEOUT_MS": float(os.environ.get("ALERT_ENQUEUE_TIMEOUT_MS", "100")),
+        "ALERT_SPOOL_DIR": os.environ.get("ALERT_SPOOL_DIR", os.path.join(storage, "alert_spool")),
+        # /api/predict/batch limits and decode parallelism
+        "BULK_MAX_IMAGES": int(os.environ.get("BULK_MAX_IMAGES", "500")),
+        "BULK_MAX_IMAGE_MB": int(os.environ.get("BULK_MAX_IMAGE_MB", "20")),
+        "BULK_DECODE_WORKERS": int(os.environ.get("BULK_DECODE_WORKERS", "4")),
+        # Async jobs (/api/predict?async=1): worker threads, bulk share, queue bound, retention
+        "JOB_WORKERS": int(os.environ.get("JOB_WORKERS", "2")),
+        "JOB_BULK_CONCURRENCY": int(os.environ.get("JOB_BULK_CONCURRENCY", "1")),
+        "JOB_MAX_QUEUED": int(os.environ.get("JOB_MAX_QUEUED", "100")),
+        "JOB_TTL_S": float(os.environ.get("JOB_TTL_S", "3600")),
+        "JOB_STALE_S": float(os.environ.get("JOB_STALE_S", "21600")),
+        # Treatment advice rules, precomputed per disease and severity at first use
+        "RECOMMENDATION_RULES": os.environ.get("RECOMMENDATION_RULES", os.path.join(root, "backend", "recommendation_rules.json")),
+        # Session tokens from /api/user/register; required on /api/predict, /api/alerts and /api/jobs unless AUTH_REQUIRED=0
+        "AUTH_REQUIRED": os.environ.get("AUTH_REQUIRED", "1").lower() not in ("0", "false", "no"),
+        "SESSION_SECRET": os.environ.get("SESSION_SECRET", ""),
+        "SESSION_TTL_S": float(os.environ.get("SESSION_TTL_S", "43200")),
+        # bcrypt runs on this many threads, with at most AUTH_MAX_PENDING logins queued or running
+        "AUTH_HASH_WORKERS": int(os.environ.get("AUTH_HASH_WORKERS", "2")),
+        "AUTH_MAX_PENDING": int(os.environ.get("AUTH_MAX_PENDING", "32")),
+        # Model promote/rollback and /api/admin/alerts: sessions of these comma-separated emails, or "X-Admin-Token: ADMIN_TOKEN".
+        # Always enforced, even with AUTH_REQUIRED=0; with neither set the endpoints are closed
+        "ADMIN_EMAILS": os.environ.get("ADMIN_EMAILS", ""),
+        "ADMIN_TOKEN": os.environ.get("ADMIN_TOKEN", ""),
+        "PREDICTION_CACHE_SIZE": int(os.environ.get("PREDICTION_CACHE_SIZE", "1024")),
+        "PREDICTION_CACHE_DIR": os.environ.get("PREDICTION_CACHE_DIR", os.path.join(storage, "prediction_cache")),
+        # Disk entries of every model version are kept this long, so swaps and rollbacks reuse them
+        "PREDICTION_CACHE_MAX_AGE_S": float(os.environ.get("PREDICTION_CACHE_MAX_AGE_S", "604800")),
+        # Max Hamming distance (of 64 bits) for two uploads to count as the same photo; -1 disables
+        "PHASH_MAX_DISTANCE": int(os.environ.get("PHASH_MAX_DISTANCE", "4")),
+        # keras | tflite | onnx; the artifact defaults to MODEL_PATH with the runtime's extension
+        "MODEL_RUNTIME": os.environ.get("MODEL_RUNTIME", "keras"),
+        "MODEL_ARTIFACT": os.environ.get("MODEL_ARTIFACT", ""),
+        "MODEL_THREADS": int(os.environ.get("MODEL_THREADS", "0")),
+        # Class labels in output order; empty uses class_names.txt next to the artifact
+        "MODEL_CLASS_NAMES": os.environ.get("MODEL_CLASS_NAMES", ""),
+        # Versioned artifacts (services/model_registry.py); its active version wins over MODEL_PATH.
+        # Serving processes check for a newly promoted version every MODEL_REGISTRY_POLL_S (0 disables)
+        "MODEL_REGISTRY_DIR": os.environ.get("MODEL_REGISTRY_DIR", os.path.join(root, "model", "registry")),
+        "MODEL_REGISTRY_POLL_S": float(os.environ.get("MODEL_REGISTRY_POLL_S", "5")),
+        # Unix socket of the shared inference server; empty runs the model in every worker
+        "INFERENCE_SOCKET": os.environ.get("INFERENCE_SOCKET", ""),
+        "INFERENCE_SERVER_START_TIMEOUT": float(os.environ.get("INFERENCE_SERVER_START_TIMEOUT", "120")),
+        # Load and warm the model at startup; batch sizes default to "1,INFER_BATCH_SIZE"
+        "MODEL_EAGER_LOAD": os.environ.get("MODEL_EAGER_LOAD", "1").lower() not in ("0", "false", "no"),
+        "MODEL_WARMUP_PASSES": int(os.environ.get("MODEL_WARMUP_PASSES", "2")),
+        "MODEL_WARMUP_BATCH_SIZES": os.environ.get("MODEL_WARMUP_BATCH_SIZES", "")
     }
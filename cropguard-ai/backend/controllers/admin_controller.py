@@ -1,8 +1,20 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 try:
-    from ..models.report import get_reports
+    from ..models.report import get_reports, get_trends
+    from ..config import get_config
+    from ..services.alert_pipeline import pipeline_stats
+    from ..services.job_service import job_stats
+    from ..services.auth_service import hasher_stats
+    from ..services.model_registry import get_registry
+    from .session import require_admin
 except ImportError:
-    from models.report import get_reports
+    from models.report import get_reports, get_trends
+    from config import get_config
+    from services.alert_pipeline import pipeline_stats
+    from services.job_service import job_stats
+    from services.auth_service import hasher_stats
+    from services.model_registry import get_registry
+    from controllers.session import require_admin
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -10,3 +22,92 @@ admin_bp = Blueprint("admin", __name__)
 def reports():
     items = get_reports()
     return jsonify({"reports": items})
+
+@admin_bp.route("/reports/trends", methods=["GET"])
+def trends():
+    period = request.args.get("period", "daily")
+    if period not in ("daily", "weekly"):
+        return jsonify({"error": "period must be daily or weekly"}), 400
+    items = get_trends(period, since=request.args.get("since"), until=request.args.get("until"))
+    return jsonify({"period": period, "trends": items})
+
+@admin_bp.route("/metrics", methods=["GET"])
+def metrics():
+    if get_config()["APP_MODE"] == "api":
+        return jsonify({"inference_batcher": None, "prediction_cache": None, "alert_pipeline": pipeline_stats(), "jobs": job_stats(), "auth": hasher_stats()})
+    # Imported here so API-only deployments never load the ML stack
+    try:
+        from ..services.ai_service import batch_stats, cache_stats
+    except ImportError:
+        from services.ai_service import batch_stats, cache_stats
+    return jsonify({"inference_batcher": batch_stats(), "prediction_cache": cache_stats(),
+                    "alert_pipeline": pipeline_stats(), "jobs": job_stats(), "auth": hasher_stats()})
+
+def _serving():
+    """readiness() of this process's model, or None in API-only mode"""
+    if get_config()["APP_MODE"] == "api":
+        return None
+    try:
+        from ..services.ai_service import readiness
+    except ImportError:
+        from services.ai_service import readiness
+    return readiness()
+
+def _activate(registry, version):
+    """
+    Check version, swap this worker to it, and only then point the registry at it
+
+    A worker that serves its own model loads and warms the version first,
+    so a promotion that cannot load is refused with 400 and never reaches
+    active.json. Other serving processes follow within MODEL_REGISTRY_POLL_S
+    (202 when this process does not serve the model itself).
+    """
+    try:
+        registry.check(version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    swap = None
+    if get_config()["APP_MODE"] != "api":
+        try:
+            from ..services.ai_service import swap_model, get_client
+        except ImportError:
+            from services.ai_service import swap_model, get_client
+        if get_client() is None:
+            swap = swap_model(version)
+            if swap is not None and swap["phase"] == "failed":
+                return jsonify({"error": swap["error"], "swap": swap}), 400
+    try:
+        pointer = registry.promote(version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body = {"active": pointer, "swap": swap, "poll_s": get_config()["MODEL_REGISTRY_POLL_S"]}
+    return jsonify(body), (200 if swap is not None else 202)
+
+@admin_bp.route("/model", methods=["GET"])
+def model_status():
+    registry = get_registry()
+    if registry is None:
+        return jsonify({"error": "model registry is disabled (MODEL_REGISTRY_DIR)"}), 404
+    return jsonify({"active": registry.active(), "versions": registry.versions(), "serving": _serving()})
+
+@admin_bp.route("/model/promote", methods=["POST"])
+@require_admin
+def model_promote():
+    registry = get_registry()
+    if registry is None:
+        return jsonify({"error": "model registry is disabled (MODEL_REGISTRY_DIR)"}), 404
+    version = (request.get_json(silent=True) or {}).get("version") or request.form.get("version")
+    if not version:
+        return jsonify({"error": "version required"}), 400
+    return _activate(registry, version)
+
+@admin_bp.route("/model/rollback", methods=["POST"])
+@require_admin
+def model_rollback():
+    registry = get_registry()
+    if registry is None:
+        return jsonify({"error": "model registry is disabled (MODEL_REGISTRY_DIR)"}), 404
+    previous = (registry.active() or {}).get("previous")
+    if not previous:
+        return jsonify({"error": "no previous model version to roll back to"}), 400
+    return _activate(registry, previous)
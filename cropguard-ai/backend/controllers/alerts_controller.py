@@ -1,13 +1,63 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context, g
 try:
-    from ..models.alert import get_alerts
+    from ..models.alert import get_alert_page, stream_alerts, decode_cursor
+    from ..models.filters import ALERT_FILTERS
+    from ..config import get_config
+    from .session import require_session, require_admin
 except ImportError:
-    from models.alert import get_alerts
+    from models.alert import get_alert_page, stream_alerts, decode_cursor
+    from models.filters import ALERT_FILTERS
+    from config import get_config
+    from controllers.session import require_session, require_admin
 
 alerts_bp = Blueprint("alerts", __name__)
 
+def _query():
+    query = {k: request.args.get(k) for k in ALERT_FILTERS}
+    query["since"] = request.args.get("since")
+    until = request.args.get("until")
+    if until is not None and len(until) == 10:
+        # A bare date means "through the end of that day"
+        until += "T23:59:59.999999"
+    query["until"] = until
+    return query
+
 @alerts_bp.route("/alerts", methods=["GET"])
+@require_session
 def alerts():
-    email = request.args.get("email")
-    items = get_alerts(email)
-    return jsonify({"alerts": items})
+    """The caller's own alerts; other users' only through /api/admin/alerts"""
+    query = _query()
+    if g.session_email is not None:
+        query["email"] = g.session_email
+    elif query["email"] is None:
+        # AUTH_REQUIRED off and no token: still never list every user's alerts
+        return jsonify({"error": "login required"}), 401, {"WWW-Authenticate": "Bearer"}
+    return _list(query)
+
+@alerts_bp.route("/admin/alerts", methods=["GET"])
+@require_admin
+def admin_alerts():
+    """Any user's alerts (?email=), or everyone's"""
+    return _list(_query())
+
+def _list(query):
+    config = get_config()
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit", type=int)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    if request.args.get("format") == "ndjson":
+        # Rows are written as they come off the storage cursor, never held as a list
+        def generate():
+            for row in stream_alerts(query, cursor=cursor, limit=limit):
+                yield json.dumps(row) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    limit = min(max(1, limit or config["ALERTS_PAGE_SIZE"]), config["ALERTS_MAX_PAGE_SIZE"])
+    items, next_cursor = get_alert_page(query, cursor=cursor, limit=limit)
+    return jsonify({"alerts": items, "next_cursor": next_cursor})
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify, g
+try:
+    from ..services.job_service import get_job
+    from .session import require_session
+except ImportError:
+    from services.job_service import get_job
+    from controllers.session import require_session
+
+jobs_bp = Blueprint("jobs", __name__)
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+@require_session
+def job_status(job_id):
+    job = get_job(job_id)
+    # Someone else's job answers exactly like a missing one
+    if job is None or job.get("owner") not in (None, g.session_email):
+        return jsonify({"error": "unknown or expired job"}), 404
+    return jsonify(job)
@@ -1,39 +1,155 @@
-from flask import Blueprint, request, jsonify
+import json
+import time
+import queue
+from flask import Blueprint, request, jsonify, Response, stream_with_context, g
 try:
-    from ..utils.image_utils import save_upload
-    from ..services.ai_service import infer
+    from ..utils.image_utils import read_upload, persist_upload
+    from ..services.ai_service import predict_image
     from ..services.recommendation_service import recommend
     from ..services.alert_service import risk_level
-    from ..models.alert import create_alert
+    from ..services.alert_pipeline import get_alert_pipeline
+    from ..services.bulk_predict import collect_inputs, predict_uploads
+    from ..services.job_service import get_job_queue
+    from ..models.alert import build_alert, create_alert
+    from ..models.repository import get_repository
+    from ..config import get_config
+    from .session import require_session
 except ImportError:
-    from utils.image_utils import save_upload
-    from services.ai_service import infer
+    from utils.image_utils import read_upload, persist_upload
+    from services.ai_service import predict_image
     from services.recommendation_service import recommend
     from services.alert_service import risk_level
-    from models.alert import create_alert
+    from services.alert_pipeline import get_alert_pipeline
+    from services.bulk_predict import collect_inputs, predict_uploads
+    from services.job_service import get_job_queue
+    from models.alert import build_alert, create_alert
+    from models.repository import get_repository
+    from config import get_config
+    from controllers.session import require_session
 
 predict_bp = Blueprint("predict", __name__)
 
-@predict_bp.route("/predict", methods=["POST"])
-def predict():
-    email = request.form.get("email", "")
-    crop_type = request.form.get("crop_type", "")
-    location = request.form.get("location", "")
-    file = request.files.get("image")
-    if not file:
-        return jsonify({"error": "image required"}), 400
-    path, name = save_upload(file)
-    res = infer(path)
-    rec = recommend(res["disease"], crop_type, res["severity"])
+def _result(res, crop_type, image_name):
+    rec = recommend(res["disease"], crop_type, res["severity"], res.get("class_id"))
     explanation = "Model indicates " + res["disease"] + " with " + str(res["confidence"]) + "% confidence."
-    result = {
+    return {
         "disease": res["disease"],
         "confidence": res["confidence"],
         "severity": res["severity"],
         "recommendation": rec,
         "explanation": explanation,
-        "image": name
+        "image": image_name,
+        "model_version": res.get("model_version")
     }
+
+def _predict_one(upload, email, crop_type, location):
+    res = predict_image(upload.data, upload.digest)
+    result = _result(res, crop_type, upload.name)
     level = risk_level(res["severity"])
-    create_alert(email, res["disease"], res["confidence"], level, location)
-    return jsonify(result)
+    pipeline = get_alert_pipeline()
+    if pipeline is not None:
+        # Spooled and written in the next batch; the response does not wait
+        pipeline.submit(build_alert(email, res["disease"], res["confidence"], level, location))
+    else:
+        create_alert(email, res["disease"], res["confidence"], level, location)
+    return result
+
+def _survey(inputs, email, crop_type, location, config):
+    """Per-image result lines for a survey, then a {"summary": ...} line"""
+    started = time.perf_counter()
+    alerts = []
+    errors = 0
+    try:
+        results = predict_uploads(inputs, batch_size=config["INFER_BATCH_SIZE"],
+                                  workers=config["BULK_DECODE_WORKERS"])
+        for index, filename, upload, res, cached, error in results:
+            if error is not None:
+                errors += 1
+                yield {"index": index, "filename": filename, "error": error}
+            else:
+                alerts.append(build_alert(email, res["disease"], res["confidence"],
+                                          risk_level(res["severity"]), location))
+                yield dict(_result(res, crop_type, upload.name), index=index, filename=filename, cached=cached)
+    finally:
+        # Also runs if the client disconnects part way through
+        if alerts:
+            get_repository().add_alerts(alerts)
+    yield {"summary": {
+        "images": len(inputs),
+        "predicted": len(alerts),
+        "errors": errors,
+        "alerts_written": len(alerts),
+        "elapsed_ms": round(1000 * (time.perf_counter() - started), 1)
+    }}
+
+def _wants_async():
+    value = request.args.get("async", request.form.get("async", ""))
+    return value.lower() in ("1", "true", "yes")
+
+def _enqueue(kind, fn, default_priority):
+    """Submit fn as a job and answer 202 with where to poll for it"""
+    priority = request.args.get("priority", request.form.get("priority", default_priority))
+    try:
+        job = get_job_queue().submit(kind, fn, priority=priority, owner=g.session_email)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except queue.Full:
+        return jsonify({"error": "job queue is full, retry later"}), 503, {"Retry-After": "5"}
+    return jsonify({"job_id": job["id"], "status": job["status"], "status_url": "/api/jobs/" + job["id"]}), 202
+
+def _email():
+    # The session's email wins over whatever the form claims
+    return g.session_email or request.form.get("email", "")
+
+@predict_bp.route("/predict", methods=["POST"])
+@require_session
+def predict():
+    email = _email()
+    crop_type = request.form.get("crop_type", "")
+    location = request.form.get("location", "")
+    file = request.files.get("image")
+    if not file:
+        return jsonify({"error": "image required"}), 400
+    upload = read_upload(file)
+    # Storing the original happens off the request path, in parallel with inference
+    persist_upload(upload)
+    if _wants_async():
+        return _enqueue("predict", lambda: _predict_one(upload, email, crop_type, location), "interactive")
+    return jsonify(_predict_one(upload, email, crop_type, location))
+
+@predict_bp.route("/predict/batch", methods=["POST"])
+@require_session
+def predict_batch():
+    """
+    Predict a field survey in one request
+
+    Images come as repeated multipart "images" fields and/or zip archives.
+    The response is NDJSON: one line per image as soon as it is predicted
+    (in completion order, with its upload index), then a summary line.
+    All alerts are stored together in one transaction at the end.
+    With async=1 the survey runs as a bulk job instead and the job result
+    holds {"results": [...], "summary": {...}}.
+    """
+    email = _email()
+    crop_type = request.form.get("crop_type", "")
+    location = request.form.get("location", "")
+    config = get_config()
+    files = request.files.getlist("images") + request.files.getlist("archive")
+    if not files:
+        return jsonify({"error": "images or archive required"}), 400
+    try:
+        inputs = collect_inputs(files, config["BULK_MAX_IMAGES"], config["BULK_MAX_IMAGE_MB"] * 2 ** 20)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if _wants_async():
+        def run():
+            lines = list(_survey(inputs, email, crop_type, location, config))
+            return {"results": lines[:-1], "summary": lines[-1]["summary"]}
+        return _enqueue("predict_batch", run, "bulk")
+
+    def generate():
+        for line in _survey(inputs, email, crop_type, location, config):
+            yield json.dumps(line) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
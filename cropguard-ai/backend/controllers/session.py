@@ -0,0 +1,66 @@
+import hmac
+from functools import wraps
+from flask import request, jsonify, g
+try:
+    from ..services.auth_service import get_session_signer
+    from ..config import get_config
+except ImportError:
+    from services.auth_service import get_session_signer
+    from config import get_config
+
+def require_session(view):
+    """
+    Authenticate the request by its "Authorization: Bearer <token>" header
+
+    The token's email is left in g.session_email. With AUTH_REQUIRED off,
+    requests without a token still pass (g.session_email is None), but a
+    bad token is always rejected.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "")
+        email = None
+        if header:
+            scheme, _, token = header.partition(" ")
+            if scheme.lower() == "bearer":
+                email = get_session_signer().verify(token.strip())
+            if email is None:
+                return jsonify({"error": "invalid or expired session"}), 401
+        elif get_config()["AUTH_REQUIRED"]:
+            return jsonify({"error": "login required"}), 401, {"WWW-Authenticate": "Bearer"}
+        g.session_email = email
+        return view(*args, **kwargs)
+    return wrapper
+
+def _admin_emails(config):
+    return {e.strip().lower() for e in config["ADMIN_EMAILS"].split(",") if e.strip()}
+
+def require_admin(view):
+    """
+    Allow only operators: an "X-Admin-Token" header matching ADMIN_TOKEN,
+    or a session token for one of ADMIN_EMAILS
+
+    Unlike require_session this ignores AUTH_REQUIRED, and rejects every
+    request while neither ADMIN_TOKEN nor ADMIN_EMAILS is configured.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = get_config()
+        admins = _admin_emails(config)
+        if not config["ADMIN_TOKEN"] and not admins:
+            return jsonify({"error": "admin access is not configured (ADMIN_TOKEN or ADMIN_EMAILS)"}), 403
+        supplied = request.headers.get("X-Admin-Token", "")
+        if supplied and config["ADMIN_TOKEN"]:
+            if hmac.compare_digest(supplied.encode("utf-8"), config["ADMIN_TOKEN"].encode("utf-8")):
+                g.session_email = None
+                return view(*args, **kwargs)
+            return jsonify({"error": "invalid admin token"}), 403
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        email = get_session_signer().verify(token.strip()) if scheme.lower() == "bearer" else None
+        if email is None:
+            return jsonify({"error": "admin login required"}), 401, {"WWW-Authenticate": "Bearer"}
+        if email.lower() not in admins:
+            return jsonify({"error": "admin access required"}), 403
+        g.session_email = email
+        return view(*args, **kwargs)
+    return wrapper
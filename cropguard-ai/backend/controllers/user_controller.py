@@ -1,8 +1,11 @@
+import queue
 from flask import Blueprint, request, jsonify
 try:
     from ..models.user import create_user, verify_user
+    from ..services.auth_service import get_session_signer
 except ImportError:
     from models.user import create_user, verify_user
+    from services.auth_service import get_session_signer
 
 user_bp = Blueprint("user", __name__)
 
@@ -15,12 +18,21 @@ def register():
     name = data.get("name", "")
     if not email or not password:
         return jsonify({"error": "email and password required"}), 400
-    if mode == "login":
-        ok = verify_user(email, password)
-        if not ok:
-            return jsonify({"error": "invalid credentials"}), 401
-        return jsonify({"status": "ok", "email": email})
-    created = create_user(email, password, name)
-    if created is None:
-        return jsonify({"error": "user exists"}), 409
-    return jsonify({"status": "ok", "email": email, "user": created})
+    try:
+        if mode == "login":
+            ok = verify_user(email, password)
+            if not ok:
+                return jsonify({"error": "invalid credentials"}), 401
+            created = None
+        else:
+            created = create_user(email, password, name)
+            if created is None:
+                return jsonify({"error": "user exists"}), 409
+    except queue.Full:
+        return jsonify({"error": "too many logins in progress, retry later"}), 503, {"Retry-After": "1"}
+    # Later calls present this token instead of the password
+    token, expires_at = get_session_signer().issue(email)
+    body = {"status": "ok", "email": email, "token": token, "expires_at": expires_at}
+    if created is not None:
+        body["user"] = created
+    return jsonify(body)
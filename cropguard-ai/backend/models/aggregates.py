@@ -0,0 +1,40 @@
+import datetime
+try:
+    from ..config import get_config
+except ImportError:
+    from config import get_config
+
+SEVERITIES = ("low", "medium", "high")
+
+
+def rollup_buckets(created_at, periods):
+    """(period, bucket) pairs an alert falls into; buckets are ISO dates"""
+    try:
+        day = datetime.date.fromisoformat(str(created_at)[:10])
+    except ValueError:
+        return []
+    out = []
+    for period in periods:
+        if period == "daily":
+            out.append(("daily", day.isoformat()))
+        elif period == "weekly":
+            out.append(("weekly", (day - datetime.timedelta(days=day.weekday())).isoformat()))
+    return out
+
+
+def empty_stats():
+    """Per-disease counters kept by the report aggregate store"""
+    return {"count": 0, "sum_conf": 0.0, "low": 0, "medium": 0, "high": 0}
+
+
+def fold(stats, doc):
+    """Add one alert document to a stats dict in place"""
+    stats["count"] += 1
+    stats["sum_conf"] += float(doc.get("confidence", 0))
+    if doc.get("severity") in SEVERITIES:
+        stats[doc["severity"]] += 1
+
+
+def rollup_periods():
+    """Time-bucket rollups enabled by REPORT_ROLLUPS, e.g. ("daily", "weekly")"""
+    return tuple(p.strip() for p in get_config()["REPORT_ROLLUPS"].split(",") if p.strip())
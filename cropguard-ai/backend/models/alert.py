@@ -1,12 +1,13 @@
+import json
+import base64
 import datetime
 try:
-    from ..utils.storage_utils import load, save
+    from .repository import get_repository
 except ImportError:
-    from utils.storage_utils import load, save
+    from models.repository import get_repository
 
-def create_alert(email, disease, confidence, severity, location):
-    alerts = load("alerts")
-    doc = {
+def build_alert(email, disease, confidence, severity, location):
+    return {
         "email": email,
         "disease": disease,
         "confidence": confidence,
@@ -14,12 +15,47 @@ def create_alert(email, disease, confidence, severity, location):
         "location": location,
         "created_at": datetime.datetime.utcnow().isoformat()
     }
-    alerts.append(doc)
-    save("alerts", alerts)
+
+def create_alert(email, disease, confidence, severity, location):
+    get_repository().add_alert(build_alert(email, disease, confidence, severity, location))
     return {"status": "ok"}
 
-def get_alerts(email=None):
-    alerts = load("alerts")
-    items = [a for a in alerts if (email is None or a.get("email")==email)]
-    items.sort(key=lambda x: x.get("created_at",""), reverse=True)
-    return items
+def get_alerts(email=None, limit=None, offset=0):
+    return get_repository().get_alerts(email, limit=limit, offset=offset)
+
+def encode_cursor(row):
+    raw = json.dumps([row["created_at"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    (created_at, id) keyset position, or ValueError for a malformed cursor.
+
+    The id comes back in the repository's own key type (see cursor_id), so
+    a cursor that decodes but names an impossible row is rejected here
+    rather than when the query runs.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(created_at, str):
+        raise ValueError("invalid cursor")
+    return created_at, get_repository().cursor_id(row_id)
+
+def get_alert_page(query, cursor=None, limit=50):
+    """
+    One keyset page of alerts, newest first.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    items = list(get_repository().iter_alerts(query, after=after, limit=limit + 1))
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def stream_alerts(query, cursor=None, limit=None):
+    """Generator over matching alerts straight from the storage cursor"""
+    after = decode_cursor(cursor) if cursor else None
+    return get_repository().iter_alerts(query, after=after, limit=limit)
@@ -1,24 +1,227 @@
-from pymongo import MongoClient
+import datetime
+try:
+    from ..utils.lazy import lazy_import, is_available
+    from .aggregates import rollup_buckets, rollup_periods, empty_stats, fold
+    from .filters import ALERT_FILTERS
+except ImportError:
+    from utils.lazy import lazy_import, is_available
+    from models.aggregates import rollup_buckets, rollup_periods, empty_stats, fold
+    from models.filters import ALERT_FILTERS
+
+# pymongo (and bson) load on first use, not when the app imports this
+# module; deployments without pymongo fall back to local storage
+pymongo = lazy_import("pymongo") if is_available("pymongo") else None
+bson = lazy_import("bson") if is_available("bson") else None
+
+# Same values as pymongo.ASCENDING / DESCENDING
+ASCENDING = 1
+DESCENDING = -1
 
 client = None
 db = None
 _db_ready = False
+# Duplicate-key error of the client _make_client() chose; mongomock
+# without pymongo installed raises its own class
+DuplicateKeyError = None
 
-def init_db(uri):
+def _make_client(uri, **options):
+    global DuplicateKeyError
+    # mongomock:// lets the backend run against an in-process stand-in
+    if uri.startswith("mongomock://"):
+        import mongomock
+        DuplicateKeyError = mongomock.DuplicateKeyError
+        return mongomock.MongoClient("mongodb://" + uri[len("mongomock://"):])
+    if pymongo is None:
+        raise ImportError("pymongo is not installed")
+    from pymongo.errors import DuplicateKeyError
+    return pymongo.MongoClient(uri, **options)
+
+def init_db(uri, max_pool_size=50, min_pool_size=0, max_idle_ms=60000, wait_queue_ms=2000):
     global client, db, _db_ready
     try:
-        client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+        client = _make_client(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            maxIdleTimeMS=max_idle_ms,
+            waitQueueTimeoutMS=wait_queue_ms,
+            serverSelectionTimeoutMS=2000,
+            retryWrites=True
+        )
         # Trigger a connection attempt
         client.server_info()
         db = client.get_default_database()
+        ensure_indexes()
         _db_ready = True
-    except Exception:
+    except Exception as e:
+        print(f"WARNING: MongoDB unavailable ({e})")
         client = None
         db = None
         _db_ready = False
+    return _db_ready
+
+def ensure_indexes():
+    db["alerts"].create_index([("email", ASCENDING), ("created_at", DESCENDING)])
+    db["alerts"].create_index([("created_at", DESCENDING)])
+    db["users"].create_index([("email", ASCENDING)], unique=True)
+    db["farms"].create_index([("email", ASCENDING)])
+    db["report_rollups"].create_index([("period", ASCENDING), ("bucket", ASCENDING)])
+    db["jobs"].create_index([("finished_at", ASCENDING)])
 
 def get_collection(name):
     return db[name] if db is not None else None
 
 def is_db_ready():
     return _db_ready
+
+
+class MongoRepository:
+    """Repository over the pooled MongoDB client set up by init_db()."""
+
+    name = "mongo"
+
+    def __init__(self):
+        self.rollups = rollup_periods()
+        self._init_reports()
+
+    def _init_reports(self):
+        """Build the report aggregates once per database, in whichever worker starts first"""
+        meta = get_collection("meta")
+        if meta.find_one({"_id": "reports_built"}) is not None:
+            return
+        try:
+            # Workers booting together race on this insert; only the winner rebuilds
+            meta.insert_one({"_id": "reports_built", "at": datetime.datetime.utcnow().isoformat()})
+        except DuplicateKeyError:
+            return
+        try:
+            if get_collection("report_totals").estimated_document_count() == 0:
+                self.rebuild_reports()
+        except BaseException:
+            meta.delete_one({"_id": "reports_built"})
+            raise
+
+    def _report_ops(self, docs):
+        """$inc upserts for report_totals and report_rollups covering docs"""
+        # Coalesce first so a bulk insert costs one update per distinct key
+        totals, rollups = {}, {}
+        for doc in docs:
+            disease = doc.get("disease", "")
+            fold(totals.setdefault(disease, empty_stats()), doc)
+            for period, bucket in rollup_buckets(doc.get("created_at"), self.rollups):
+                fold(rollups.setdefault((period, bucket, disease), empty_stats()), doc)
+        for disease, inc in totals.items():
+            get_collection("report_totals").update_one(
+                {"_id": disease}, {"$inc": inc, "$set": {"disease": disease}}, upsert=True)
+        for key, inc in rollups.items():
+            get_collection("report_rollups").update_one(
+                {"_id": "|".join(key)}, {"$inc": inc, "$set": {"period": key[0], "bucket": key[1], "disease": key[2]}}, upsert=True)
+
+    def add_alert(self, doc):
+        get_collection("alerts").insert_one(dict(doc))
+        self._report_ops([doc])
+
+    def add_alerts(self, docs):
+        if docs:
+            get_collection("alerts").insert_many([dict(d) for d in docs], ordered=False)
+            self._report_ops(docs)
+
+    def get_report_totals(self):
+        return list(get_collection("report_totals").find({}, {"_id": 0}))
+
+    def get_report_rollups(self, period, since=None, until=None):
+        query = {"period": period, "bucket": {"$gte": since or "", "$lte": until or "9999-12-31"}}
+        return list(get_collection("report_rollups").find(query, {"_id": 0}).sort([("bucket", ASCENDING), ("disease", ASCENDING)]))
+
+    def rebuild_reports(self):
+        """
+        Recompute the aggregates from the alerts
+
+        Every key is replaced in place (upsert) and only keys that no longer
+        have alerts are deleted, so the collections are never empty midway
+        and concurrent rebuilds cannot collide on _id. Counts for alerts
+        stored while the rebuild runs can still be off until the next one.
+        """
+        totals, rollups = {}, {}
+        for doc in get_collection("alerts").find({}, {"_id": 0, "disease": 1, "confidence": 1, "severity": 1, "created_at": 1}):
+            disease = doc.get("disease", "")
+            fold(totals.setdefault(disease, empty_stats()), doc)
+            for period, bucket in rollup_buckets(doc.get("created_at"), self.rollups):
+                fold(rollups.setdefault((period, bucket, disease), empty_stats()), doc)
+        for disease, stats in totals.items():
+            get_collection("report_totals").replace_one(
+                {"_id": disease}, dict(stats, disease=disease), upsert=True)
+        for key, stats in rollups.items():
+            get_collection("report_rollups").replace_one(
+                {"_id": "|".join(key)}, dict(stats, period=key[0], bucket=key[1], disease=key[2]), upsert=True)
+        get_collection("report_totals").delete_many({"_id": {"$nin": list(totals)}})
+        get_collection("report_rollups").delete_many({"_id": {"$nin": ["|".join(k) for k in rollups]}})
+
+    def get_alerts(self, email=None, limit=None, offset=0):
+        query = {} if email is None else {"email": email}
+        cur = get_collection("alerts").find(query, {"_id": 0}).sort([("created_at", DESCENDING), ("_id", DESCENDING)]).skip(offset)
+        if limit is not None:
+            cur = cur.limit(limit)
+        return list(cur)
+
+    @staticmethod
+    def cursor_id(value):
+        """ObjectId from an alerts cursor, or ValueError"""
+        if not isinstance(value, str) or not bson.ObjectId.is_valid(value):
+            raise ValueError("invalid cursor")
+        return bson.ObjectId(value)
+
+    def iter_alerts(self, query, after=None, limit=None, chunk=500):
+        cond = {k: query[k] for k in ALERT_FILTERS if query.get(k) is not None}
+        created = {}
+        if query.get("since") is not None:
+            created["$gte"] = query["since"]
+        if query.get("until") is not None:
+            created["$lte"] = query["until"]
+        if created:
+            cond["created_at"] = created
+        if after is not None:
+            cond = {"$and": [cond, {"$or": [
+                {"created_at": {"$lt": after[0]}},
+                {"created_at": after[0], "_id": {"$lt": after[1]}}
+            ]}]}
+        cur = get_collection("alerts").find(cond).sort([("created_at", DESCENDING), ("_id", DESCENDING)]).batch_size(chunk)
+        if limit is not None:
+            cur = cur.limit(limit)
+        for doc in cur:
+            doc["id"] = str(doc.pop("_id"))
+            yield doc
+
+    def add_farm(self, doc):
+        get_collection("farms").insert_one(dict(doc))
+
+    def get_farms(self, email):
+        return list(get_collection("farms").find({"email": email}, {"_id": 0}))
+
+    def add_user(self, doc):
+        try:
+            get_collection("users").insert_one(dict(doc))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def get_user(self, email):
+        return get_collection("users").find_one({"email": email}, {"_id": 0})
+
+    def put_job(self, job):
+        get_collection("jobs").replace_one({"_id": job["id"]}, dict(job, _id=job["id"]), upsert=True)
+
+    def get_job(self, job_id):
+        return get_collection("jobs").find_one({"_id": job_id}, {"_id": 0})
+
+    def expire_jobs(self, finished_before, stale_before):
+        jobs = get_collection("jobs")
+        removed = jobs.delete_many({"finished_at": {"$ne": None, "$lt": finished_before}}).deleted_count
+        failed = 0
+        for job in jobs.find({"finished_at": None, "updated_at": {"$lt": stale_before}}):
+            res = jobs.update_one(
+                {"_id": job["_id"], "finished_at": None},
+                {"$set": {"status": "failed", "error": "job was lost (worker stopped)", "finished_at": job["updated_at"]}}
+            )
+            failed += res.modified_count
+        return removed, failed
@@ -1,11 +1,10 @@
 import datetime
 try:
-    from ..utils.storage_utils import load, save
+    from .repository import get_repository
 except ImportError:
-    from utils.storage_utils import load, save
+    from models.repository import get_repository
 
 def add_farm(email, crop_type, sow_date, location):
-    farms = load("farms")
     doc = {
         "email": email,
         "crop_type": crop_type,
@@ -13,10 +12,8 @@ def add_farm(email, crop_type, sow_date, location):
         "location": location,
         "created_at": datetime.datetime.utcnow().isoformat()
     }
-    farms.append(doc)
-    save("farms", farms)
+    get_repository().add_farm(doc)
     return {"status": "ok"}
 
 def get_farms(email):
-    farms = load("farms")
-    return [f for f in farms if f.get("email")==email]
+    return get_repository().get_farms(email)
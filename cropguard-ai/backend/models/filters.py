@@ -0,0 +1,14 @@
+# Exact-match alert fields accepted as filters by /api/alerts
+ALERT_FILTERS = ("email", "severity", "disease", "location")
+
+def alert_matches(doc, query):
+    """In-process equivalent of the repository WHERE clause for one alert"""
+    for key in ALERT_FILTERS:
+        if query.get(key) is not None and doc.get(key) != query[key]:
+            return False
+    created = doc.get("created_at", "")
+    if query.get("since") is not None and created < query["since"]:
+        return False
+    if query.get("until") is not None and created > query["until"]:
+        return False
+    return True
@@ -1,15 +1,40 @@
+import sys
 try:
-    from ..utils.storage_utils import load
+    from .repository import get_repository
+    from ..services.labels import VOCABULARY, label_id
 except ImportError:
-    from utils.storage_utils import load
+    from models.repository import get_repository
+    from services.labels import VOCABULARY, label_id
+
+def _summary(row):
+    count = row["count"]
+    # Aggregates are stored by label; the crop comes from the interned split
+    class_id = label_id(row["disease"] or "")
+    return {
+        "disease": row["disease"],
+        "crop": VOCABULARY.crops[class_id],
+        "count": count,
+        "avg_confidence": (row["sum_conf"] / count if count else 0),
+        "severity": {"low": row["low"], "medium": row["medium"], "high": row["high"]}
+    }
 
 def get_reports():
-    alerts = load("alerts")
-    agg = {}
-    for a in alerts:
-        d = a.get("disease")
-        if d not in agg:
-            agg[d] = {"count": 0, "sum_conf": 0.0}
-        agg[d]["count"] += 1
-        agg[d]["sum_conf"] += float(a.get("confidence", 0))
-    return [{"disease": k, "count": v["count"], "avg_confidence": (v["sum_conf"] / v["count"] if v["count"] else 0)} for k, v in agg.items()]
+    # Served from the materialised per-disease aggregates, O(number of diseases)
+    return [_summary(r) for r in get_repository().get_report_totals()]
+
+def get_trends(period="daily", since=None, until=None):
+    rows = get_repository().get_report_rollups(period, since=since, until=until)
+    return [dict(_summary(r), bucket=r["bucket"]) for r in rows]
+
+def rebuild_reports():
+    """Recompute every aggregate from the stored alerts (recovery path)"""
+    get_repository().rebuild_reports()
+    return get_reports()
+
+if __name__ == "__main__":
+    # python -m models.report rebuild   (run from the backend directory)
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m models.report rebuild")
+        sys.exit(2)
+    items = rebuild_reports()
+    print(f"Rebuilt report aggregates for {len(items)} diseases")
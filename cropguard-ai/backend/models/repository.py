@@ -0,0 +1,486 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+try:
+    from ..config import get_config
+    from ..utils import storage_utils
+    from . import db as mongo
+    from .aggregates import SEVERITIES, rollup_buckets, rollup_periods, empty_stats, fold
+    from .filters import ALERT_FILTERS, alert_matches
+except ImportError:
+    from config import get_config
+    from utils import storage_utils
+    from models import db as mongo
+    from models.aggregates import SEVERITIES, rollup_buckets, rollup_periods, empty_stats, fold
+    from models.filters import ALERT_FILTERS, alert_matches
+
+def _row_position(value):
+    """Integer keyset id from an alerts cursor (log position or SQLite rowid)"""
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value < 2 ** 63:
+        raise ValueError("invalid cursor")
+    return value
+
+class LogRepository:
+    """Repository over the append-only JSON-lines files in STORAGE_PATH."""
+
+    name = "log"
+
+    def __init__(self):
+        self.rollups = rollup_periods()
+        self._agg_lock = threading.Lock()
+        self._reset_reports()
+        self._users = {}
+        self._users_seen = 0
+        self._users_lock = threading.Lock()
+
+    def _reset_reports(self):
+        self._folded = 0
+        self._totals = {}
+        self._rollup_stats = {}
+
+    def _fold_new_alerts(self):
+        # Aggregates are folded from the log tail, so other workers' writes count too
+        with self._agg_lock:
+            new = storage_utils.tail("alerts", self._folded)
+            for doc in new:
+                d = doc.get("disease")
+                fold(self._totals.setdefault(d, empty_stats()), doc)
+                for period, bucket in rollup_buckets(doc.get("created_at"), self.rollups):
+                    fold(self._rollup_stats.setdefault((period, bucket, d), empty_stats()), doc)
+            self._folded += len(new)
+
+    def get_report_totals(self):
+        self._fold_new_alerts()
+        return [dict(v, disease=k) for k, v in self._totals.items()]
+
+    def get_report_rollups(self, period, since=None, until=None):
+        self._fold_new_alerts()
+        rows = [dict(v, period=p, bucket=b, disease=d) for (p, b, d), v in self._rollup_stats.items()
+                if p == period and (since is None or b >= since) and (until is None or b <= until)]
+        rows.sort(key=lambda r: (r["bucket"], r["disease"] or ""))
+        return rows
+
+    def rebuild_reports(self):
+        with self._agg_lock:
+            self._reset_reports()
+        self._fold_new_alerts()
+
+    def add_alert(self, doc):
+        storage_utils.append("alerts", doc)
+
+    def add_alerts(self, docs):
+        for doc in docs:
+            storage_utils.append("alerts", doc)
+
+    def get_alerts(self, email=None, limit=None, offset=0):
+        alerts = storage_utils.load("alerts")
+        items = [a for a in alerts if (email is None or a.get("email")==email)]
+        items.sort(key=lambda x: x.get("created_at",""), reverse=True)
+        end = None if limit is None else offset + limit
+        return items[offset:end]
+
+    @staticmethod
+    def cursor_id(value):
+        return _row_position(value)
+
+    def iter_alerts(self, query, after=None, limit=None):
+        # Log position is the keyset: newest records are at the end of the file
+        before = None if after is None else after[1]
+        n = 0
+        for pos, doc in storage_utils.iter_reversed("alerts", before):
+            if limit is not None and n >= limit:
+                return
+            if alert_matches(doc, query):
+                n += 1
+                yield dict(doc, id=pos)
+
+    def add_farm(self, doc):
+        storage_utils.append("farms", doc)
+
+    def get_farms(self, email):
+        farms = storage_utils.load("farms")
+        return [f for f in farms if f.get("email")==email]
+
+    def add_user(self, doc):
+        return storage_utils.append("users", doc, unique_key="email")
+
+    def get_user(self, email):
+        # email -> user index, topped up from the log tail so other workers' signups appear
+        with self._users_lock:
+            new = storage_utils.tail("users", self._users_seen)
+            for u in new:
+                self._users.setdefault(u.get("email"), u)
+            self._users_seen += len(new)
+            return self._users.get(email)
+
+    def put_job(self, job):
+        # Each state change is appended; the newest record for an id wins
+        storage_utils.append("jobs", job)
+
+    def get_job(self, job_id):
+        for _, doc in storage_utils.iter_reversed("jobs"):
+            if doc.get("id") == job_id:
+                return doc
+        return None
+
+    def expire_jobs(self, finished_before, stale_before):
+        counts = [0, 0]
+
+        def expire(docs):
+            latest = {}
+            for doc in docs:
+                latest[doc.get("id")] = doc
+            keep = []
+            for doc in latest.values():
+                if doc.get("finished_at") is not None:
+                    if doc["finished_at"] < finished_before:
+                        counts[0] += 1
+                        continue
+                elif doc.get("updated_at", "") < stale_before:
+                    doc = dict(doc, status="failed", error="job was lost (worker stopped)",
+                               finished_at=doc.get("updated_at"))
+                    counts[1] += 1
+                keep.append(doc)
+            return keep
+
+        # Also drops superseded state records of the remaining jobs
+        storage_utils.rewrite("jobs", expire)
+        return tuple(counts)
+
+
+_SCHEMA = [
+    # users matches the table already present in storage/cropguard.db
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        disease TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        severity TEXT NOT NULL,
+        location TEXT,
+        created_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS farms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        crop_type TEXT NOT NULL,
+        sow_date TEXT NOT NULL,
+        location TEXT,
+        created_at TEXT NOT NULL
+    )""",
+    # Materialised report aggregates, maintained on every alert insert
+    """CREATE TABLE IF NOT EXISTS report_totals (
+        disease TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        sum_conf REAL NOT NULL,
+        low INTEGER NOT NULL,
+        medium INTEGER NOT NULL,
+        high INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS report_rollups (
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        disease TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        sum_conf REAL NOT NULL,
+        low INTEGER NOT NULL,
+        medium INTEGER NOT NULL,
+        high INTEGER NOT NULL,
+        PRIMARY KEY (period, bucket, disease)
+    )""",
+    # One-off markers such as "legacy_import", so startup work runs once per database
+    """CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )""",
+    # Async prediction jobs; doc holds the whole job as JSON
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        finished_at TEXT,
+        doc TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_email_created ON alerts (email, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_farms_email_created ON farms (email, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)",
+]
+
+_INSERT_ALERT = "INSERT INTO alerts (email, disease, confidence, severity, location, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+_SELECT_ALERTS = "SELECT email, disease, confidence, severity, location, created_at FROM alerts ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+_SELECT_ALERTS_BY_EMAIL = "SELECT email, disease, confidence, severity, location, created_at FROM alerts WHERE email = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+_BUMP_TOTALS = """INSERT INTO report_totals (disease, count, sum_conf, low, medium, high) VALUES (?, 1, ?, ?, ?, ?)
+    ON CONFLICT (disease) DO UPDATE SET count = count + 1, sum_conf = sum_conf + excluded.sum_conf,
+    low = low + excluded.low, medium = medium + excluded.medium, high = high + excluded.high"""
+_BUMP_ROLLUP = """INSERT INTO report_rollups (period, bucket, disease, count, sum_conf, low, medium, high) VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+    ON CONFLICT (period, bucket, disease) DO UPDATE SET count = count + 1, sum_conf = sum_conf + excluded.sum_conf,
+    low = low + excluded.low, medium = medium + excluded.medium, high = high + excluded.high"""
+_SELECT_TOTALS = "SELECT disease, count, sum_conf, low, medium, high FROM report_totals"
+_SELECT_ROLLUPS = "SELECT period, bucket, disease, count, sum_conf, low, medium, high FROM report_rollups WHERE period = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket, disease"
+_REBUILD_TOTALS = """INSERT INTO report_totals (disease, count, sum_conf, low, medium, high)
+    SELECT disease, COUNT(*), SUM(confidence), SUM(severity = 'low'), SUM(severity = 'medium'), SUM(severity = 'high')
+    FROM alerts GROUP BY disease"""
+# Bucket expressions mirror rollup_buckets(): ISO day, and the Monday starting the week
+_BUCKET_SQL = {
+    "daily": "date(substr(created_at, 1, 10))",
+    "weekly": "date(substr(created_at, 1, 10), '-6 days', 'weekday 1')",
+}
+_REBUILD_ROLLUP = """INSERT INTO report_rollups (period, bucket, disease, count, sum_conf, low, medium, high)
+    SELECT ?, bucket, disease, COUNT(*), SUM(confidence), SUM(severity = 'low'), SUM(severity = 'medium'), SUM(severity = 'high')
+    FROM (SELECT {bucket} AS bucket, disease, confidence, severity FROM alerts)
+    WHERE bucket IS NOT NULL GROUP BY bucket, disease"""
+_SELECT_ALERT_PAGE = "SELECT id, email, disease, confidence, severity, location, created_at FROM alerts"
+_INSERT_FARM = "INSERT INTO farms (email, crop_type, sow_date, location, created_at) VALUES (?, ?, ?, ?, ?)"
+_SELECT_FARMS = "SELECT email, crop_type, sow_date, location, created_at FROM farms WHERE email = ? ORDER BY created_at"
+_INSERT_USER = "INSERT INTO users (email, password_hash, name, created_at) VALUES (?, ?, ?, ?)"
+_IMPORT_USER = "INSERT OR IGNORE INTO users (email, password_hash, name, created_at) VALUES (?, ?, ?, ?)"
+_SELECT_USER = "SELECT email, password_hash AS password, name, created_at FROM users WHERE email = ?"
+_PUT_JOB = """INSERT INTO jobs (id, status, updated_at, finished_at, doc) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at,
+    finished_at = excluded.finished_at, doc = excluded.doc"""
+_SELECT_JOB = "SELECT doc FROM jobs WHERE id = ?"
+_SELECT_META = "SELECT value FROM meta WHERE key = ?"
+_PUT_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+_DELETE_FINISHED_JOBS = "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?"
+_SELECT_STALE_JOBS = "SELECT doc FROM jobs WHERE finished_at IS NULL AND updated_at < ?"
+
+
+class SqliteRepository:
+    """
+    Repository over a single SQLite file in WAL mode.
+
+    Each thread gets its own connection; statements are fixed SQL strings so
+    sqlite3's per-connection statement cache reuses the prepared statements.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self.rollups = rollup_periods()
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, cached_statements=64, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+        self._import_legacy(conn)
+
+    @staticmethod
+    def _legacy(name):
+        # Only collections that were actually written; load() would create the file
+        return storage_utils.load(name) if storage_utils.exists(name) else []
+
+    def _import_legacy(self, conn):
+        """
+        Copy JSON/JSON-lines collections into empty tables, once per database.
+
+        Completion is recorded in the meta table, so later startups neither
+        re-read the files nor create empty ones in STORAGE_PATH.
+        """
+        if conn.execute(_SELECT_META, ("legacy_import",)).fetchone() is not None:
+            return
+        with conn:
+            # IMMEDIATE takes the write lock up front so only one worker imports
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(_SELECT_META, ("legacy_import",)).fetchone() is not None:
+                return
+            if conn.execute("SELECT 1 FROM alerts LIMIT 1").fetchone() is None:
+                conn.executemany(_INSERT_ALERT, [self._alert_row(a) for a in self._legacy("alerts")])
+            if conn.execute("SELECT 1 FROM farms LIMIT 1").fetchone() is None:
+                conn.executemany(_INSERT_FARM, [self._farm_row(f) for f in self._legacy("farms")])
+            conn.executemany(_IMPORT_USER, [self._user_row(u) for u in self._legacy("users")])
+            if conn.execute("SELECT 1 FROM report_totals LIMIT 1").fetchone() is None:
+                self._rebuild_reports(conn)
+            conn.execute(_PUT_META, ("legacy_import", datetime.datetime.utcnow().isoformat()))
+
+    @staticmethod
+    def _alert_row(doc):
+        return (doc.get("email", ""), doc.get("disease", ""), float(doc.get("confidence", 0)),
+                doc.get("severity", ""), doc.get("location", ""), doc.get("created_at", ""))
+
+    @staticmethod
+    def _farm_row(doc):
+        return (doc.get("email", ""), doc.get("crop_type", ""), doc.get("sow_date", ""),
+                doc.get("location", ""), doc.get("created_at", ""))
+
+    @staticmethod
+    def _user_row(doc):
+        return (doc.get("email", ""), doc.get("password", ""), doc.get("name", ""), doc.get("created_at", ""))
+
+    def _bump_reports(self, conn, doc):
+        conf = float(doc.get("confidence", 0))
+        sev = [int(doc.get("severity") == s) for s in SEVERITIES]
+        conn.execute(_BUMP_TOTALS, [doc.get("disease", ""), conf] + sev)
+        for period, bucket in rollup_buckets(doc.get("created_at"), self.rollups):
+            conn.execute(_BUMP_ROLLUP, [period, bucket, doc.get("disease", ""), conf] + sev)
+
+    def add_alert(self, doc):
+        conn = self._conn()
+        with conn:
+            conn.execute(_INSERT_ALERT, self._alert_row(doc))
+            self._bump_reports(conn, doc)
+
+    def add_alerts(self, docs):
+        conn = self._conn()
+        with conn:
+            conn.executemany(_INSERT_ALERT, [self._alert_row(d) for d in docs])
+            for doc in docs:
+                self._bump_reports(conn, doc)
+
+    def get_report_totals(self):
+        return [dict(r) for r in self._conn().execute(_SELECT_TOTALS)]
+
+    def get_report_rollups(self, period, since=None, until=None):
+        rows = self._conn().execute(_SELECT_ROLLUPS, (period, since or "", until or "9999-12-31"))
+        return [dict(r) for r in rows]
+
+    def _rebuild_reports(self, conn):
+        conn.execute("DELETE FROM report_totals")
+        conn.execute("DELETE FROM report_rollups")
+        conn.execute(_REBUILD_TOTALS)
+        for period in self.rollups:
+            if period in _BUCKET_SQL:
+                conn.execute(_REBUILD_ROLLUP.format(bucket=_BUCKET_SQL[period]), (period,))
+
+    def rebuild_reports(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild_reports(conn)
+
+    def get_alerts(self, email=None, limit=None, offset=0):
+        limit = -1 if limit is None else limit
+        if email is None:
+            rows = self._conn().execute(_SELECT_ALERTS, (limit, offset))
+        else:
+            rows = self._conn().execute(_SELECT_ALERTS_BY_EMAIL, (email, limit, offset))
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def cursor_id(value):
+        return _row_position(value)
+
+    def iter_alerts(self, query, after=None, limit=None, chunk=500):
+        where, params = [], []
+        for col in ALERT_FILTERS:
+            if query.get(col) is not None:
+                where.append(col + " = ?")
+                params.append(query[col])
+        if query.get("since") is not None:
+            where.append("created_at >= ?")
+            params.append(query["since"])
+        if query.get("until") is not None:
+            where.append("created_at <= ?")
+            params.append(query["until"])
+        if after is not None:
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params += [after[0], after[0], after[1]]
+        sql = _SELECT_ALERT_PAGE + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY created_at DESC, id DESC LIMIT ?"
+        cur = self._conn().execute(sql, params + [-1 if limit is None else limit])
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            for r in rows:
+                yield dict(r)
+
+    def add_farm(self, doc):
+        conn = self._conn()
+        with conn:
+            conn.execute(_INSERT_FARM, self._farm_row(doc))
+
+    def get_farms(self, email):
+        return [dict(r) for r in self._conn().execute(_SELECT_FARMS, (email,))]
+
+    def add_user(self, doc):
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute(_INSERT_USER, self._user_row(doc))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def get_user(self, email):
+        row = self._conn().execute(_SELECT_USER, (email,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def put_job(self, job):
+        conn = self._conn()
+        with conn:
+            conn.execute(_PUT_JOB, (job["id"], job["status"], job["updated_at"], job.get("finished_at"), json.dumps(job)))
+
+    def get_job(self, job_id):
+        row = self._conn().execute(_SELECT_JOB, (job_id,)).fetchone()
+        return json.loads(row["doc"]) if row is not None else None
+
+    def expire_jobs(self, finished_before, stale_before):
+        conn = self._conn()
+        with conn:
+            removed = conn.execute(_DELETE_FINISHED_JOBS, (finished_before,)).rowcount
+            stale = [json.loads(r["doc"]) for r in conn.execute(_SELECT_STALE_JOBS, (stale_before,))]
+            for job in stale:
+                job.update(status="failed", error="job was lost (worker stopped)", finished_at=job["updated_at"])
+                conn.execute(_PUT_JOB, (job["id"], job["status"], job["updated_at"], job["finished_at"], json.dumps(job)))
+        return removed, len(stale)
+
+
+_repo = None
+_repo_lock = threading.Lock()
+
+
+def _local_repository(config):
+    if config["STORAGE_BACKEND"] == "log":
+        return LogRepository()
+    os.makedirs(os.path.dirname(config["SQLITE_PATH"]), exist_ok=True)
+    return SqliteRepository(config["SQLITE_PATH"])
+
+def get_repository():
+    """
+    Return the process-wide repository selected by STORAGE_BACKEND.
+
+    "mongo" uses the pooled client from models.db and falls back to the
+    local SQLite store when MongoDB cannot be reached at startup.
+    """
+    global _repo
+    if _repo is None:
+        with _repo_lock:
+            if _repo is None:
+                config = get_config()
+                if config["STORAGE_BACKEND"] == "mongo":
+                    ready = mongo.init_db(
+                        config["MONGODB_URI"],
+                        max_pool_size=config["MONGO_MAX_POOL_SIZE"],
+                        min_pool_size=config["MONGO_MIN_POOL_SIZE"]
+                    )
+                    if ready:
+                        _repo = mongo.MongoRepository()
+                    else:
+                        print("Falling back to local storage")
+                        _repo = _local_repository(config)
+                else:
+                    _repo = _local_repository(config)
+    return _repo
@@ -1,23 +1,20 @@
 import datetime
-import bcrypt
 try:
-    from ..utils.storage_utils import load, save
+    from .repository import get_repository
+    from ..services.auth_service import get_password_hasher
 except ImportError:
-    from utils.storage_utils import load, save
+    from models.repository import get_repository
+    from services.auth_service import get_password_hasher
 
 def create_user(email, password, name):
-    users = load("users")
-    if any(u.get("email")==email for u in users):
-        return None
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    hashed = get_password_hasher().hash(password)
     doc = {"email": email, "password": hashed, "name": name, "created_at": datetime.datetime.utcnow().isoformat()}
-    users.append(doc)
-    save("users", users)
+    if not get_repository().add_user(doc):
+        return None
     return {"email": email, "name": name}
 
 def verify_user(email, password):
-    users = load("users")
-    u = next((u for u in users if u.get("email")==email), None)
+    u = get_repository().get_user(email)
     if not u:
         return False
-    return bcrypt.checkpw(password.encode("utf-8"), u["password"].encode("utf-8"))
+    return get_password_hasher().check(password, u["password"])
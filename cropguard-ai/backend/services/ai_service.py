@@ -1,23 +1,41 @@
 import numpy as np
-from PIL import Image
 import os
 import random
-
-# Try to import TensorFlow
-try:
-    import tensorflow as tf
-    from tensorflow import keras
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
-    print("WARNING: TensorFlow not available. Using fallback prediction.")
+import atexit
+import hashlib
+import threading
+import time
+from collections import namedtuple
 
 try:
     from ..config import get_config
+    from .batch_service import MicroBatcher
+    from .prediction_cache import PredictionCache
+    from .preprocess import TARGET_SIZE, load_image, load_thumbnail, decode_resized, preprocess_image, BatchBuffer
+    from .model_runtime import load_runtime, artifact_path
+    from .inference_server import InferenceClient
+    from .model_registry import get_registry, CLASS_NAMES_FILE
+    from .labels import LabelSet, VOCABULARY, label_id
+    from ..utils.lazy import is_available
 except ImportError:
     from config import get_config
+    from services.batch_service import MicroBatcher
+    from services.prediction_cache import PredictionCache
+    from services.preprocess import TARGET_SIZE, load_image, load_thumbnail, decode_resized, preprocess_image, BatchBuffer
+    from services.model_runtime import load_runtime, artifact_path
+    from services.inference_server import InferenceClient
+    from services.model_registry import get_registry, CLASS_NAMES_FILE
+    from services.labels import LabelSet, VOCABULARY, label_id
+    from utils.lazy import is_available
+
+# TensorFlow is only imported when the keras runtime loads the model
+TF_AVAILABLE = is_available("tensorflow")
+if not TF_AVAILABLE:
+    print("WARNING: TensorFlow not available. Using fallback prediction.")
 
-# Disease classes - matches the trained Plant Disease model (38 classes)
+# Disease classes of the bundled Plant Disease model (38 classes). Models
+# normally ship their own labels in class_names.txt next to the artifact;
+# this list is only used for an artifact without one.
 CLASSES = [
     "Apple___Apple_scab",
     "Apple___Black_rot",
@@ -60,86 +78,346 @@ CLASSES = [
 ]
 
 
-# Global model variable
+# A loaded model together with what decodes its output. Swapping models
+# replaces the whole tuple, so a forward pass never mixes two versions.
+ServingModel = namedtuple("ServingModel", ["runtime", "version", "labels"])
+
+# Global model state; _model is None when predictions use the fallback
 _model = None
 _model_loaded = False
+# Cache namespace for fallback predictions; bump when the fallback changes
+FALLBACK_VERSION = "fallback-2"
+# Fallback features are measured on a thumbnail of this size
+FALLBACK_THUMBNAIL = (128, 128)
+
+_model_lock = threading.RLock()
+_warmup_thread = None
+_status = {"phase": "idle", "backend": None, "load_time_ms": None, "warmup": None, "error": None, "swap": None}
+_swap_lock = threading.Lock()
+_watch_thread = None
+_labels = {}
+_batcher = None
+_batcher_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+_in_process = False
+
+def _file_version(path):
+    """Short fingerprint of a model file: path, size and mtime"""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
 
 def load_model():
-    """Load the trained model from disk"""
-    global _model, _model_loaded
-    
+    """
+    Load the trained model: the registry's active version if one was
+    promoted, otherwise MODEL_PATH with the runtime selected by MODEL_RUNTIME
+
+    Returns:
+        The ServingModel answering predictions, or None when predictions
+        should use the fallback
+    """
     if _model_loaded:
         return _model
+    # Startup warmup and the first request may race to load
+    with _model_lock:
+        if not _model_loaded:
+            started = time.perf_counter()
+            _load_model()
+            _status["load_time_ms"] = round(1000 * (time.perf_counter() - started), 1)
+            _status["backend"] = _model.runtime.name if _model is not None else "fallback"
+    return _model
+
+def _load_version(registry, version, threads):
+    """Verify and load one registry version (does not make it active)"""
+    manifest = registry.verify(version)
+    path = registry.artifact_path(version)
+    print(f"Loading {manifest['runtime']} model version {version} from {path}")
+    labels = LabelSet.from_file(registry.class_names_path(version))
+    runtime = load_runtime(manifest["runtime"], path, threads=threads)
+    return ServingModel(runtime, version, labels.validate(runtime.output_dim))
+
+def _artifact_labels(config, model_path):
+    """
+    Labels for a model loaded from MODEL_PATH: MODEL_CLASS_NAMES, else the
+    class_names.txt the training CLI writes next to the artifact, else CLASSES
+    """
+    path = config["MODEL_CLASS_NAMES"] or os.path.join(os.path.dirname(model_path), CLASS_NAMES_FILE)
+    if os.path.exists(path):
+        return LabelSet.from_file(path)
+    print(f"WARNING: {path} not found; assuming the built-in {len(CLASSES)} classes")
+    return LabelSet(CLASSES, source="ai_service.CLASSES")
+
+def _load_registry_model(registry, active, threads):
+    """
+    The active registry version, else the one it replaced; None if neither loads
+
+    A bad promotion must not leave every restarted worker on the fallback.
+    """
+    for version in (active["version"], active.get("previous")):
+        if not version:
+            continue
+        try:
+            model = _load_version(registry, version, threads)
+        except Exception as e:
+            print(f"ERROR loading model version {version}: {e}")
+            _status["error"] = f"model version {version}: {e}"
+            continue
+        if version != active["version"]:
+            print(f"WARNING: serving previous model version {version} instead of {active['version']}")
+        return model
+    return None
+
+def _load_model():
+    global _model, _model_loaded
     
-    if not TF_AVAILABLE:
+    config = get_config()
+    runtime = config["MODEL_RUNTIME"]
+    registry = get_registry()
+    active = registry.active() if registry is not None else None
+
+    if active is not None:
+        _model = _load_registry_model(registry, active, config["MODEL_THREADS"])
+        if _model is not None:
+            _model_loaded = True
+            print("Model loaded successfully!")
+            return
+        print("Falling back to MODEL_PATH")
+
+    if runtime == "keras" and not TF_AVAILABLE:
         print("TensorFlow not available. Using fallback predictions.")
         _model_loaded = True
-        return None
+        return
     
     try:
-        config = get_config()
-        model_path = config.get("MODEL_PATH", "model/crop_disease_model.h5")
+        model_path = config["MODEL_ARTIFACT"] or artifact_path(config["MODEL_PATH"], runtime)
         
         if os.path.exists(model_path):
-            print(f"Loading model from {model_path}")
-            _model = keras.models.load_model(model_path)
+            print(f"Loading {runtime} model from {model_path}")
+            labels = _artifact_labels(config, model_path)
+            loaded = load_runtime(runtime, model_path, threads=config["MODEL_THREADS"])
+            # A label list that does not match the output would mislabel every prediction
+            _model = ServingModel(loaded, runtime + "-" + _file_version(model_path),
+                                  labels.validate(loaded.output_dim))
             _model_loaded = True
             print("Model loaded successfully!")
-            return _model
         else:
             print(f"WARNING: Model file not found at {model_path}")
             print("Using fallback prediction. Please train and save a model.")
             _model_loaded = True
-            return None
     except Exception as e:
         print(f"ERROR loading model: {e}")
+        _status["error"] = str(e)
         _model_loaded = True
-        return None
 
-def preprocess_image(image_path, target_size=(224, 224)):
+def _warmup_batch_sizes(config):
+    sizes = config["MODEL_WARMUP_BATCH_SIZES"] or f"1,{config['INFER_BATCH_SIZE']}"
+    return sorted({max(1, int(n)) for n in sizes.split(",") if n.strip()})
+
+def _warm(runtime, config):
+    """Forward passes on zero batches; returns latencies in ms per batch size"""
+    latency = {}
+    for n in _warmup_batch_sizes(config):
+        batch = np.zeros((n,) + TARGET_SIZE[::-1] + (3,), dtype=np.float32)
+        times = []
+        for _ in range(max(1, config["MODEL_WARMUP_PASSES"])):
+            started = time.perf_counter()
+            runtime.predict(batch)
+            times.append(round(1000 * (time.perf_counter() - started), 1))
+        latency[str(n)] = times
+    return latency
+
+def warmup():
     """
-    Preprocess image for model prediction
-    
-    Args:
-        image_path: Path to the image file
-        target_size: Target size for the model (default: 224x224)
-    
+    Load the model and run MODEL_WARMUP_PASSES forward passes on zero
+    batches at each expected batch size, so graph building, kernel
+    selection and buffer allocation happen before the first request.
+
     Returns:
-        Preprocessed numpy array ready for prediction
+        The readiness status dictionary
     """
-    try:
-        # Load and resize image
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize(target_size)
-        
-        # Convert to array and normalize
-        img_array = np.array(img, dtype=np.float32)
-        img_array = img_array / 255.0  # Normalize to [0, 1]
-        
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        return img_array
-    except Exception as e:
-        print(f"Error preprocessing image: {e}")
-        raise
+    _status["phase"] = "loading"
+    model = load_model()
+    if model is not None:
+        config = get_config()
+        _status["phase"] = "warming"
+        try:
+            latency = _warm(model.runtime, config)
+        except Exception as e:
+            # A model that cannot run a zero batch will not serve requests either
+            print(f"ERROR during model warmup: {e}")
+            _status["error"] = str(e)
+            _status["phase"] = "failed"
+            return readiness()
+        _status["warmup"] = {"passes": config["MODEL_WARMUP_PASSES"], "latency_ms": latency}
+    _status["phase"] = "ready"
+    return readiness()
 
-def fallback_prediction(image_path):
+def start_warmup():
+    """Run warmup() once in a background thread (no-op if already started)"""
+    global _warmup_thread
+    with _model_lock:
+        if _warmup_thread is not None:
+            return
+        if get_client() is not None:
+            # The inference server warms its own model before listening
+            return
+        _warmup_thread = threading.Thread(target=warmup, name="model-warmup", daemon=True)
+        _warmup_thread.start()
+    start_registry_watch()
+
+def swap_model(version):
+    """
+    Load a registry version, warm it up and make it the serving model
+
+    Runs on the calling thread; requests keep using the current model
+    until the new one has finished warming. Batches already running
+    finish on the model they started with.
+
+    Returns:
+        The swap status dictionary (also in readiness()["swap"])
+    """
+    global _model, _model_loaded
+    registry = get_registry()
+    with _swap_lock:
+        current = load_model()
+        if current is not None and current.version == version:
+            return {"version": version, "from": version, "phase": "active",
+                    "load_time_ms": None, "warmup": None, "error": None}
+        config = get_config()
+        swap = {"version": version, "from": current.version if current else FALLBACK_VERSION,
+                "phase": "loading", "load_time_ms": None, "warmup": None, "error": None}
+        _status["swap"] = swap
+        try:
+            if registry is None:
+                raise ValueError("MODEL_REGISTRY_DIR is not set")
+            started = time.perf_counter()
+            candidate = _load_version(registry, version, config["MODEL_THREADS"])
+            swap["load_time_ms"] = round(1000 * (time.perf_counter() - started), 1)
+            swap["phase"] = "warming"
+            latency = _warm(candidate.runtime, config)
+            swap["warmup"] = {"passes": config["MODEL_WARMUP_PASSES"], "latency_ms": latency}
+        except Exception as e:
+            # The current model keeps serving
+            print(f"ERROR swapping to model version {version}: {e}")
+            swap["phase"] = "failed"
+            swap["error"] = str(e)
+            return swap
+        with _model_lock:
+            _model = candidate
+            _model_loaded = True
+            _status["backend"] = candidate.runtime.name
+            _status["error"] = None
+            if _status["phase"] != "ready":
+                _status["phase"] = "ready"
+        swap["phase"] = "active"
+        print(f"Serving model version {version}")
+        return swap
+
+def start_swap(version):
+    """Run swap_model() in a background thread"""
+    threading.Thread(target=swap_model, args=(version,), name="model-swap", daemon=True).start()
+
+def _watch_registry(registry, interval):
+    seen = registry.stamp()
+    while True:
+        time.sleep(interval)
+        try:
+            stamp = registry.stamp()
+            if stamp == seen:
+                continue
+            seen = stamp
+            active = registry.active()
+            current = load_model()
+            if active and (current is None or active["version"] != current.version):
+                swap_model(active["version"])
+        except Exception as e:
+            print(f"Model registry watch error: {e}")
+
+def start_registry_watch():
+    """
+    Poll the registry's active pointer every MODEL_REGISTRY_POLL_S and
+    swap to newly promoted versions, so a promotion made through one
+    worker reaches every process that serves a model
+    """
+    global _watch_thread
+    config = get_config()
+    registry = get_registry()
+    if registry is None or config["MODEL_REGISTRY_POLL_S"] <= 0:
+        return
+    with _model_lock:
+        if _watch_thread is not None or get_client() is not None:
+            return
+        _watch_thread = threading.Thread(target=_watch_registry, args=(registry, config["MODEL_REGISTRY_POLL_S"]),
+                                         name="model-registry-watch", daemon=True)
+        _watch_thread.start()
+
+def readiness():
+    """
+    Startup status for /health/ready
+
+    Returns:
+        Dictionary with ready, phase, backend, model_version, load_time_ms,
+        warmup (per batch size latencies) and error
+    """
+    client = get_client()
+    if client is not None:
+        try:
+            status = client.info()["status"]
+        except Exception as e:
+            return {"ready": False, "phase": "unavailable", "backend": "inference-server",
+                    "error": f"inference server unavailable: {e}"}
+        return dict(status, backend="inference-server:" + str(status.get("backend")))
+    model = _model
+    status = dict(_status, model_version=model.version if model is not None else FALLBACK_VERSION)
+    if status["phase"] == "idle":
+        # No warmup was started (MODEL_EAGER_LOAD=0): the model loads on the
+        # first prediction, so the worker can take traffic either way
+        status["phase"] = "ready" if _model_loaded else "lazy"
+        status["backend"] = status["backend"] or ("fallback" if _model_loaded else None)
+    status["ready"] = status["phase"] in ("ready", "lazy")
+    return status
+
+def _fallback_features(image):
+    """
+    Channel means and standard deviations of a FALLBACK_THUMBNAIL thumbnail
+
+    Both come from one reduction over [x, x^2] per channel, instead of six
+    passes over a full-size float32 copy.
+    """
+    thumb = load_thumbnail(image, FALLBACK_THUMBNAIL)
+    x = np.asarray(thumb, dtype=np.float64).reshape(-1, 3)
+    moments = np.stack((x, x * x)).mean(axis=1)
+    mean = moments[0]
+    std = np.sqrt(np.maximum(moments[1] - mean * mean, 0.0))
+    return mean, std, thumb
+
+def _fallback_hash(image, digest, thumb):
+    """0-99 selector that is stable for a given upload"""
+    if digest is None:
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                image = f.read()
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            digest = hashlib.sha256(image).hexdigest()
+        else:
+            # Already decoded: hash the (small) thumbnail pixels instead
+            digest = hashlib.sha256(thumb.tobytes()).hexdigest()
+    return int(digest[:8], 16) % 100
+
+def fallback_prediction(image, digest=None):
     """
     Fallback prediction when no model is available.
     Uses image features to provide varied predictions.
+    Accepts the same sources as load_image(); digest is the SHA-256 hex of
+    the compressed upload when the caller already has it.
     """
     try:
-        img = Image.open(image_path).convert('RGB')
-        img_array = np.array(img, dtype=np.float32)
-        
-        # Extract various image features for more varied predictions
-        mean_r = float(img_array[:, :, 0].mean())
-        mean_g = float(img_array[:, :, 1].mean())
-        mean_b = float(img_array[:, :, 2].mean())
-        std_r = float(img_array[:, :, 0].std())
-        std_g = float(img_array[:, :, 1].std())
-        std_b = float(img_array[:, :, 2].std())
+        if hasattr(image, "read"):
+            image = image.read()
+        (mean_r, mean_g, mean_b), (std_r, std_g, std_b), thumb = _fallback_features(image)
         
         # Calculate overall brightness and variation
         brightness = (mean_r + mean_g + mean_b) / 3.0
@@ -149,10 +427,8 @@ def fallback_prediction(image_path):
         green_dominance = mean_g - (mean_r + mean_b) / 2.0
         
         # Use features to determine disease with more variation
-        # Hash the image data to get consistent but varied results
-        import hashlib
-        img_hash = hashlib.md5(img_array.tobytes()).hexdigest()
-        hash_val = int(img_hash[:8], 16) % 100
+        # Hash the compressed upload to get consistent but varied results
+        hash_val = _fallback_hash(image, digest, thumb)
         
         # Determine crop type based on color characteristics
         if green_dominance > 20 and brightness > 120:
@@ -209,8 +485,10 @@ def fallback_prediction(image_path):
         
         return {
             "disease": disease,
+            "class_id": label_id(disease),
             "confidence": round(confidence, 2),
-            "severity": severity
+            "severity": severity,
+            "model_version": FALLBACK_VERSION
         }
 
     except Exception as e:
@@ -218,60 +496,317 @@ def fallback_prediction(image_path):
         # Ultimate fallback
         return {
             "disease": "Unknown",
+            "class_id": label_id("Unknown"),
             "confidence": 50.0,
-            "severity": "medium"
+            "severity": "medium",
+            "model_version": FALLBACK_VERSION
         }
 
-def infer(file_path):
+def run_in_process():
+    """Ignore INFERENCE_SOCKET in this process (used by the inference server itself)"""
+    global _in_process
+    _in_process = True
+
+def get_client():
+    """
+    Return the inference server client when INFERENCE_SOCKET is set, or
+    None when this process should load and run the model itself
+    """
+    global _client
+    if _in_process:
+        return None
+    if _client is None:
+        socket_path = get_config()["INFERENCE_SOCKET"]
+        if not socket_path:
+            return None
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient(socket_path)
+                atexit.register(_client.close)
+    return _client
+
+def _predict_batch(batch):
+    """
+    Run one forward pass over a stacked (N, H, W, 3) batch
+
+    Returns:
+        (probabilities, ServingModel) per row, so callers decode each row
+        with the model that produced it even if a swap lands meanwhile
+    """
+    model = load_model()
+    if model is None:
+        raise RuntimeError("no model loaded")
+    return [(row, model) for row in model.runtime.predict(batch)]
+
+def predict_pixels(pixels):
+    """
+    Probabilities for a list of uint8 (H, W, 3) images through the batcher
+
+    Returns:
+        (probabilities (N, classes), ServingModel); all rows come from the
+        same model version
+    """
+    while True:
+        rows = get_batcher().submit_many(pixels)
+        model = rows[0][1]
+        if all(m is model for _, m in rows):
+            return np.stack([probs for probs, _ in rows]), model
+        # A swap landed between two of this request's batches; rerun them on the new model
+
+def get_batcher():
+    """Return the process-wide micro-batcher, starting it on first use"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                config = get_config()
+                # Requests queue raw uint8 pixels; the batcher normalises them
+                # straight into one preallocated float32 buffer per batch
+                _batcher = MicroBatcher(
+                    _predict_batch,
+                    max_batch_size=config["INFER_BATCH_SIZE"],
+                    max_wait_ms=config["INFER_BATCH_WAIT_MS"],
+                    collate_fn=BatchBuffer(config["INFER_BATCH_SIZE"]).collate
+                )
+    return _batcher
+
+def model_version():
+    """Identifier of the model answering predictions (FALLBACK_VERSION if none)"""
+    client = get_client()
+    if client is not None:
+        if client.model_version is None:
+            try:
+                client.info()
+            except Exception as e:
+                print(f"Inference server unavailable: {e}")
+                return FALLBACK_VERSION
+        return client.model_version
+    model = load_model()
+    return model.version if model is not None else FALLBACK_VERSION
+
+def labels_for(version):
+    """
+    LabelSet for the output rows of a model version this process did not
+    load itself (the inference server's): the registry version's
+    class_names.txt, or the MODEL_PATH artifact's labels
+    """
+    labels = _labels.get(version)
+    if labels is None:
+        registry = get_registry()
+        path = None
+        if registry is not None:
+            try:
+                path = registry.class_names_path(version)
+            except ValueError:
+                pass
+        if path is not None and os.path.exists(path):
+            labels = LabelSet.from_file(path)
+        else:
+            config = get_config()
+            model_path = config["MODEL_ARTIFACT"] or artifact_path(config["MODEL_PATH"], config["MODEL_RUNTIME"])
+            labels = _artifact_labels(config, model_path)
+        _labels[version] = labels
+    return labels
+
+def get_cache():
+    """Return the process-wide prediction cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = get_config()
+                _cache = PredictionCache(
+                    max_items=config["PREDICTION_CACHE_SIZE"],
+                    disk_dir=config["PREDICTION_CACHE_DIR"] or None,
+                    max_age_s=config["PREDICTION_CACHE_MAX_AGE_S"]
+                )
+    return _cache
+
+def cache_stats():
+    return get_cache().stats()
+
+def batch_stats():
+    """Queue depth and batch fill metrics for the inference batcher"""
+    client = get_client()
+    if client is not None:
+        try:
+            return client.info()["batcher"]
+        except Exception as e:
+            return {"error": f"inference server unavailable: {e}"}
+    if _batcher is None:
+        return {"queue_depth": 0, "batches": 0, "items": 0}
+    return _batcher.stats()
+
+def decode_prediction(probs, model):
+    """
+    Turn one row of model output into the prediction dictionary
+
+    Args:
+        probs: 1-D array of class probabilities
+        model: ServingModel (or anything with version and labels) that
+            produced the row
+
+    Returns:
+        Dictionary with disease, class_id (see labels.VOCABULARY),
+        confidence, severity and model_version
+    """
+    # Get predicted class and confidence
+    predicted_class_idx = np.argmax(probs)
+    confidence = float(probs[predicted_class_idx]) * 100
+
+    # Get disease name and its interned id
+    labels = model.labels
+    if predicted_class_idx < len(labels):
+        disease = labels.names[predicted_class_idx]
+        class_id = labels.ids[predicted_class_idx]
+    else:
+        disease = "Unknown"
+        class_id = label_id(disease)
+
+    # Determine severity based on confidence and disease type
+    if VOCABULARY.healthy[class_id]:
+        severity = "low"
+    elif confidence >= 80:
+        severity = "high"
+    elif confidence >= 60:
+        severity = "medium"
+    else:
+        severity = "low"
+
+    return {
+        "disease": disease,
+        "class_id": class_id,
+        "confidence": round(confidence, 2),
+        "severity": severity,
+        "model_version": model.version
+    }
+
+def infer(source, digest=None):
     """
     Perform disease prediction on the given image
+
+    The image is decoded once; the same decoded image feeds the model or,
+    if that fails, the fallback. Concurrent calls are grouped by the
+    micro-batcher so the model runs one forward pass per batch instead of
+    one per request. With INFERENCE_SOCKET set the batcher and the model
+    live in the shared inference server instead of this process.
     
     Args:
-        file_path: Path to the image file
+        source: Path, raw bytes, file-like object or PIL image
+        digest: SHA-256 hex of the upload, if known (seeds the fallback)
     
     Returns:
         Dictionary with disease, confidence, and severity
     """
+    try:
+        img = load_image(source)
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return fallback_prediction(source, digest)
+
+    client = get_client()
+    if client is not None:
+        try:
+            # The shared inference server batches across all workers
+            reply = client.predict(decode_resized(img))
+            if reply is not None:
+                probs, version = reply
+                return decode_prediction(probs, ServingModel(None, version, labels_for(version)))
+        except Exception as e:
+            print(f"Error during model prediction: {e}")
+            print("Falling back to feature-based prediction")
+        return fallback_prediction(img, digest)
+
     # Load model if not already loaded
     model = load_model()
     
     # If no model available, use fallback
     if model is None:
         print("Using fallback prediction (no model loaded)")
-        return fallback_prediction(file_path)
+        return fallback_prediction(img, digest)
     
     try:
-        # Preprocess image
-        img_array = preprocess_image(file_path)
-        
-        # Make prediction
-        predictions = model.predict(img_array, verbose=0)
+        # Resize only; normalisation happens in the batch buffer
+        pixels = decode_resized(img)
         
-        # Get predicted class and confidence
-        predicted_class_idx = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class_idx]) * 100
+        # Queue for the next batched forward pass
+        probs, model = get_batcher().submit(pixels)
         
-        # Get disease name
-        disease = CLASSES[predicted_class_idx] if predicted_class_idx < len(CLASSES) else "Unknown"
-        
-        # Determine severity based on confidence and disease type
-        if disease == "Healthy":
-            severity = "low"
-        elif confidence >= 80:
-            severity = "high"
-        elif confidence >= 60:
-            severity = "medium"
-        else:
-            severity = "low"
-        
-        return {
-            "disease": disease,
-            "confidence": round(confidence, 2),
-            "severity": severity
-        }
+        return decode_prediction(probs, model)
     
     except Exception as e:
         print(f"Error during model prediction: {e}")
         print("Falling back to feature-based prediction")
-        return fallback_prediction(file_path)
+        return fallback_prediction(img, digest)
+
+def infer_many(images, digests=None):
+    """
+    Predictions for several already decoded images (see load_image), with
+    their uploads' SHA-256 digests if known
+
+    All images enter the batcher together, so the model sees full-size
+    batches. Any failure falls back per image, as infer() does.
 
+    Returns:
+        List of prediction dictionaries, in input order
+    """
+    if not images:
+        return []
+    try:
+        pixels = [decode_resized(img) for img in images]
+        client = get_client()
+        if client is not None:
+            reply = client.predict_many(np.stack(pixels))
+            if reply is not None:
+                rows, version = reply
+                reply = rows, ServingModel(None, version, labels_for(version))
+        elif load_model() is not None:
+            reply = predict_pixels(pixels)
+        else:
+            reply = None
+        if reply is not None:
+            rows, model = reply
+            return [decode_prediction(r, model) for r in rows]
+    except Exception as e:
+        print(f"Error during batch prediction: {e}")
+        print("Falling back to feature-based prediction")
+    digests = digests or [None] * len(images)
+    return [fallback_prediction(img, d) for img, d in zip(images, digests)]
+
+def cache_prediction(cache, digest, res):
+    """
+    Cache a fresh prediction under the version that actually produced it
+
+    A fallback answer is only kept while no model is available at all; when
+    the model merely failed for this request, caching it would keep serving
+    the fallback after the model recovers.
+    """
+    version = res.get("model_version")
+    if version is None or res.get("disease") == "Unknown":
+        return
+    if version == FALLBACK_VERSION and model_version() != FALLBACK_VERSION:
+        return
+    cache.put(version, digest, res)
+
+def predict_image(data, digest):
+    """
+    Cached front end to infer()
+
+    Args:
+        data: Uploaded image bytes (or anything infer() accepts)
+        digest: SHA-256 hex digest of the uploaded bytes
+
+    Returns:
+        Dictionary with disease, confidence, and severity
+    """
+    version = model_version()
+    cache = get_cache()
+    res = cache.get(version, digest)
+    if res is not None:
+        # Entries cached before predictions carried their version; ids are per process
+        res.setdefault("model_version", version)
+        res["class_id"] = label_id(res["disease"])
+        return res
+    res = infer(data, digest)
+    cache_prediction(cache, digest, res)
+    return res
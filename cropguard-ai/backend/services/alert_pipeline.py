@@ -0,0 +1,285 @@
+import os
+import json
+import glob
+import time
+import queue
+import atexit
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: spools cannot be claimed safely, so only our own is replayed
+    fcntl = None
+
+try:
+    from ..config import get_config
+    from ..models.repository import get_repository
+except ImportError:
+    from config import get_config
+    from models.repository import get_repository
+
+_STOP = object()
+
+
+class AlertSpool:
+    """
+    Per-process write-ahead file for queued alerts.
+
+    Every alert is appended as {"seq": n, "doc": {...}} before it is
+    queued, and {"done": [n, ...]} is appended once the storage backend has
+    committed it. The owning process holds an exclusive flock on the file,
+    so another process can tell a crashed worker's spool from a live one
+    and replay whatever was never marked done. Replay is at-least-once: a
+    crash between the storage commit and the done marker repeats that batch.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{time.time_ns()}.jsonl")
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._open = 0
+        self._lines = 0
+
+    def _write(self, record):
+        # One os.write per line: survives a process crash without an fsync
+        os.write(self._fd, (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+        self._lines += 1
+
+    def append(self, doc):
+        with self._lock:
+            self._seq += 1
+            self._write({"seq": self._seq, "doc": doc})
+            self._open += 1
+            return self._seq
+
+    def done(self, seqs):
+        with self._lock:
+            self._write({"done": list(seqs)})
+            self._open -= len(seqs)
+            if self._open == 0 and self._lines >= 1000:
+                # Everything is committed; start the file over
+                os.ftruncate(self._fd, 0)
+                self._lines = 0
+
+    def sync(self):
+        os.fsync(self._fd)
+
+    def close(self, remove=True):
+        with self._lock:
+            if self._fd is None:
+                return
+            os.close(self._fd)
+            self._fd = None
+            if remove and self._open == 0:
+                os.remove(self.path)
+
+    @staticmethod
+    def pending(path):
+        """Docs in a spool file that were never marked done"""
+        docs = {}
+        done = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                if "done" in rec:
+                    done.update(rec["done"])
+                else:
+                    docs[rec["seq"]] = rec["doc"]
+        return [doc for seq, doc in sorted(docs.items()) if seq not in done]
+
+    def recover(self, write_fn):
+        """
+        Replay spools left behind by processes that died before draining
+
+        Never raises: a spool that cannot be read is renamed to
+        <name>.jsonl.bad for inspection, and one whose alerts cannot be
+        written right now is left for the next process to replay.
+
+        Returns the number of alerts written.
+        """
+        if fcntl is None:
+            return 0
+        recovered = 0
+        for path in glob.glob(os.path.join(self.directory, "*.jsonl")):
+            if path == self.path:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"Could not open alert spool {path}: {e}")
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)  # owner is still running
+                continue
+            try:
+                if not os.path.exists(path):
+                    continue  # another process replayed it first
+                try:
+                    docs = self.pending(path)
+                except Exception as e:
+                    print(f"Unreadable alert spool {path} ({e}); moved aside")
+                    os.replace(path, path + ".bad")
+                    continue
+                if docs:
+                    try:
+                        write_fn(docs)
+                    except Exception as e:
+                        print(f"Could not replay alert spool {path}: {e}")
+                        continue
+                    recovered += len(docs)
+                os.remove(path)
+            except OSError as e:
+                print(f"Could not recover alert spool {path}: {e}")
+            finally:
+                os.close(fd)
+        return recovered
+
+
+class AlertPipeline:
+    """
+    Writes alerts off the request path.
+
+    submit() spools the alert and puts it on a bounded queue; a writer
+    thread drains the queue in batches of up to max_batch_size (or whatever
+    arrived within max_wait_ms) and stores each batch with one
+    add_alerts() call. When the queue is full, submit() waits up to
+    enqueue_timeout_ms and then writes the alert itself, so a slow backend
+    slows producers down instead of dropping alerts or growing memory.
+    close() drains the queue; the spool covers crashes.
+    """
+
+    def __init__(self, write_fn, spool_dir, max_queue=1000, max_batch_size=100,
+                 max_wait_ms=50.0, enqueue_timeout_ms=100.0):
+        self.write_fn = write_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.enqueue_timeout = max(0.0, float(enqueue_timeout_ms)) / 1000.0
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._spool = AlertSpool(spool_dir)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._written = 0
+        self._failures = 0
+        self._sync_writes = 0
+        self._recovered = self._spool.recover(write_fn)
+        self._thread = threading.Thread(target=self._run, name="alert-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, doc):
+        """Queue one alert document for storage"""
+        if self._closed:
+            self.write_fn([doc])
+            return
+        seq = self._spool.append(doc)
+        try:
+            self._queue.put((seq, doc), timeout=self.enqueue_timeout)
+        except queue.Full:
+            # Backpressure: the writer is behind, store this one inline
+            self.write_fn([doc])
+            self._spool.done([seq])
+            with self._lock:
+                self._sync_writes += 1
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size and items[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            stop = items[-1] is _STOP
+            batch = [item for item in items if item is not _STOP]
+            if batch:
+                self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        seqs = [seq for seq, _ in batch]
+        try:
+            self._spool.sync()
+            self.write_fn([doc for _, doc in batch])
+        except Exception as e:
+            # Left open in the spool; the next process to start replays them
+            print(f"ERROR writing {len(batch)} alerts: {e}")
+            with self._lock:
+                self._failures += len(batch)
+            return
+        self._spool.done(seqs)
+        with self._lock:
+            self._batches += 1
+            self._written += len(batch)
+
+    def close(self, timeout=10.0):
+        """Stop accepting work, write everything queued, remove the spool"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._spool.close(remove=not self._thread.is_alive())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "batches": self._batches,
+                "written": self._written,
+                "avg_batch_size": round(self._written / self._batches, 2) if self._batches else 0.0,
+                "sync_writes": self._sync_writes,
+                "failed": self._failures,
+                "recovered": self._recovered
+            }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_alert_pipeline():
+    """Return the process-wide alert pipeline, or None when ALERT_PIPELINE is off"""
+    global _pipeline
+    if _pipeline is None:
+        config = get_config()
+        if not config["ALERT_PIPELINE"]:
+            return None
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = AlertPipeline(
+                    get_repository().add_alerts,
+                    config["ALERT_SPOOL_DIR"],
+                    max_queue=config["ALERT_QUEUE_SIZE"],
+                    max_batch_size=config["ALERT_BATCH_SIZE"],
+                    max_wait_ms=config["ALERT_BATCH_WAIT_MS"],
+                    enqueue_timeout_ms=config["ALERT_ENQUEUE_TIMEOUT_MS"]
+                )
+                atexit.register(_pipeline.close)
+    return _pipeline
+
+
+def pipeline_stats():
+    return _pipeline.stats() if _pipeline is not None else None
@@ -0,0 +1,176 @@
+import os
+import hmac
+import json
+import time
+import queue
+import base64
+import hashlib
+import secrets
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..config import get_config
+    from ..utils.lazy import lazy_import
+except ImportError:
+    from config import get_config
+    from utils.lazy import lazy_import
+
+bcrypt = lazy_import("bcrypt")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small thread pool.
+
+    bcrypt releases the GIL, so `workers` hashes run in parallel while the
+    request threads only wait. At most max_pending calls may be queued or
+    running; beyond that hash()/check() raise queue.Full after
+    wait_timeout_s instead of piling up CPU work behind a login burst.
+    """
+
+    def __init__(self, workers=2, max_pending=32, wait_timeout_s=5.0):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self.wait_timeout = float(wait_timeout_s)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counts = {"hashed": 0, "checked": 0, "rejected": 0}
+        self._busy_s = 0.0
+
+    def _run(self, kind, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise queue.Full
+        with self._lock:
+            self._pending += 1
+        try:
+            started = time.perf_counter()
+            result = self._pool.submit(fn, *args).result()
+            with self._lock:
+                self._counts[kind] += 1
+                self._busy_s += time.perf_counter() - started
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def hash(self, password):
+        hashed = self._run("hashed", bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt())
+        return hashed.decode("utf-8")
+
+    def check(self, password, hashed):
+        return self._run("checked", bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def stats(self):
+        with self._lock:
+            calls = self._counts["hashed"] + self._counts["checked"]
+            return dict(self._counts, pending=self._pending, workers=self.workers, max_pending=self.max_pending,
+                        avg_wait_ms=round(1000 * self._busy_s / calls, 2) if calls else 0.0)
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionSigner:
+    """
+    Stateless session tokens: base64url([email, expiry]) "." HMAC-SHA256.
+
+    Verifying one costs a single HMAC, so API calls never touch bcrypt or
+    the user store. Tokens cannot be revoked before they expire; rotating
+    the secret invalidates all of them.
+    """
+
+    def __init__(self, secret, ttl_s=43200.0):
+        self.secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.ttl = float(ttl_s)
+
+    def _sign(self, body):
+        return _b64(hmac.new(self.secret, body.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, email):
+        """Return (token, expires_at ISO string) for email"""
+        expires = int(time.time() + self.ttl)
+        body = _b64(json.dumps([email, expires]).encode("utf-8"))
+        return body + "." + self._sign(body), datetime.datetime.utcfromtimestamp(expires).isoformat()
+
+    def verify(self, token):
+        """The token's email, or None when it is malformed, forged or expired"""
+        body, _, signature = (token or "").partition(".")
+        if not body or not (body + signature).isascii():
+            # Real tokens are base64url; compare_digest and _sign reject other text with TypeError/UnicodeError
+            return None
+        if not hmac.compare_digest(signature, self._sign(body)):
+            return None
+        try:
+            email, expires = json.loads(_unb64(body))
+        except Exception:
+            return None
+        if expires < time.time():
+            return None
+        return email
+
+
+def _session_secret(config):
+    """SESSION_SECRET, or a random secret shared by all workers through STORAGE_PATH"""
+    if config["SESSION_SECRET"]:
+        return config["SESSION_SECRET"]
+    os.makedirs(config["STORAGE_PATH"], exist_ok=True)
+    path = os.path.join(config["STORAGE_PATH"], "session_secret")
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link() fails if another worker got there first; theirs wins
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    with open(path, "r") as f:
+        return f.read().strip()
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+_signer = None
+_signer_lock = threading.Lock()
+
+
+def get_password_hasher():
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                config = get_config()
+                _hasher = PasswordHasher(
+                    workers=config["AUTH_HASH_WORKERS"],
+                    max_pending=config["AUTH_MAX_PENDING"]
+                )
+    return _hasher
+
+
+def get_session_signer():
+    global _signer
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                config = get_config()
+                _signer = SessionSigner(_session_secret(config), ttl_s=config["SESSION_TTL_S"])
+    return _signer
+
+
+def hasher_stats():
+    return _hasher.stats() if _hasher is not None else None
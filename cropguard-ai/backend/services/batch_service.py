@@ -0,0 +1,109 @@
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects concurrent inference requests into a single forward pass.
+
+    Requests are queued by submit(); a worker thread flushes the queue
+    when it holds max_batch_size items or when the oldest item has waited
+    max_wait_ms, runs predict_fn once on the batch built by collate_fn
+    (np.stack by default) and hands each row of the output back to the
+    caller that submitted it.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, collate_fn=None):
+        self.predict_fn = predict_fn
+        self.collate_fn = collate_fn or np.stack
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._last_batch_size = 0
+        self._full_flushes = 0
+        self._timeout_flushes = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, sample, timeout=None):
+        """
+        Queue one sample (shape (1, ...) or (...)) and block until its
+        prediction row is available.
+        """
+        if sample.ndim and sample.shape[0] == 1:
+            sample = sample[0]
+        fut = Future()
+        self._queue.put((sample, fut))
+        return fut.result(timeout=timeout)
+
+    def submit_many(self, samples, timeout=None):
+        """
+        Queue several samples at once and block until all rows are back.
+
+        They enter the queue back to back, so a bulk request fills whole
+        batches instead of trickling in one flush window at a time.
+        """
+        futures = []
+        for sample in samples:
+            fut = Future()
+            self._queue.put((sample, fut))
+            futures.append(fut)
+        return [fut.result(timeout=timeout) for fut in futures]
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            samples = [s for s, _ in items]
+            futures = [f for _, f in items]
+            try:
+                outputs = self.predict_fn(self.collate_fn(samples))
+                for i, fut in enumerate(futures):
+                    fut.set_result(outputs[i])
+            except Exception as e:
+                for fut in futures:
+                    if not fut.done():
+                        fut.set_exception(e)
+            with self._lock:
+                self._batches += 1
+                self._items += len(items)
+                self._last_batch_size = len(items)
+                if len(items) >= self.max_batch_size:
+                    self._full_flushes += 1
+                else:
+                    self._timeout_flushes += 1
+
+    def stats(self):
+        with self._lock:
+            avg = (self._items / self._batches) if self._batches else 0.0
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": round(avg, 2),
+                "avg_batch_fill": round(avg / self.max_batch_size, 4),
+                "full_flushes": self._full_flushes,
+                "timeout_flushes": self._timeout_flushes
+            }
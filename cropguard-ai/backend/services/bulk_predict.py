@@ -0,0 +1,138 @@
+import os
+import shutil
+import zipfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from .ai_service import infer_many, model_version, get_cache, cache_prediction
+    from .labels import label_id
+    from .preprocess import load_image
+    from ..utils.image_utils import read_upload_bytes, persist_upload
+except ImportError:
+    from services.ai_service import infer_many, model_version, get_cache, cache_prediction
+    from services.labels import label_id
+    from services.preprocess import load_image
+    from utils.image_utils import read_upload_bytes, persist_upload
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def collect_inputs(files, max_images, max_bytes):
+    """
+    Flatten uploaded files into [(filename, load)] where load() returns the
+    image bytes. Zip archives contribute every image inside them.
+
+    Werkzeug closes request files when the view returns, before a streamed
+    response runs, so plain images are read now and archives are copied to
+    a temporary file owned by the returned loaders.
+
+    Raises:
+        ValueError: more than max_images images, or an unreadable archive
+    """
+    inputs = []
+    for f in files:
+        name = f.filename or ""
+        if name.lower().endswith(".zip"):
+            spool = tempfile.SpooledTemporaryFile(max_size=32 * 2 ** 20)
+            shutil.copyfileobj(f.stream, spool)
+            try:
+                archive = zipfile.ZipFile(spool)
+            except zipfile.BadZipFile:
+                raise ValueError(f"{name} is not a valid zip archive")
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename:
+                    continue
+                if not base.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                if info.file_size > max_bytes:
+                    inputs.append((info.filename, _too_large(info.filename, max_bytes)))
+                else:
+                    # ZipFile reads are safe from several threads
+                    inputs.append((info.filename, lambda a=archive, i=info: a.read(i)))
+        else:
+            data = f.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                inputs.append((name, _too_large(name, max_bytes)))
+            else:
+                inputs.append((name, lambda d=data: d))
+        if len(inputs) > max_images:
+            raise ValueError(f"at most {max_images} images per request")
+    return inputs
+
+
+def _too_large(name, max_bytes):
+    def load():
+        raise ValueError(f"{name} is larger than {max_bytes // 2 ** 20} MB")
+    return load
+
+
+def _prepare(index, filename, load, version, cache):
+    """Read, hash and decode one image on a pool thread"""
+    try:
+        data = load()
+        upload = read_upload_bytes(data, filename)
+        persist_upload(upload)
+        res = cache.get(version, upload.digest)
+        if res is not None:
+            res.setdefault("model_version", version)
+            res["class_id"] = label_id(res["disease"])
+            return index, filename, upload, res, None, None
+        return index, filename, upload, None, load_image(data), None
+    except Exception as e:
+        return index, filename, None, None, None, str(e)
+
+
+def predict_uploads(inputs, batch_size=16, workers=4):
+    """
+    Predict many uploads, yielding results as they become available
+
+    Decoding runs on a thread pool (at most a few batches ahead of the
+    model, to bound memory); decoded images are sent to the model
+    batch_size at a time and cached predictions skip the model entirely.
+
+    Yields:
+        (index, filename, upload, prediction, cached, error) tuples, in
+        completion order; prediction is None when error is set
+    """
+    version = model_version()
+    cache = get_cache()
+    window = workers + 2 * batch_size
+    todo = iter(enumerate(inputs))
+    running = set()
+    pending = []
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-decode")
+
+    def flush(n):
+        batch = pending[:n]
+        del pending[:n]
+        results = infer_many([img for _, _, _, img in batch], [upload.digest for _, _, upload, _ in batch])
+        for (index, filename, upload, _), res in zip(batch, results):
+            # Keyed by the model that answered: a swap or a failed batch may differ from version
+            cache_prediction(cache, upload.digest, res)
+            yield index, filename, upload, res, False, None
+
+    try:
+        while True:
+            for index, (filename, load) in todo:
+                running.add(pool.submit(_prepare, index, filename, load, version, cache))
+                if len(running) >= window:
+                    break
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                index, filename, upload, res, img, error = fut.result()
+                if error is not None:
+                    yield index, filename, None, None, False, error
+                elif res is not None:
+                    yield index, filename, upload, res, True, None
+                else:
+                    pending.append((index, filename, upload, img))
+            while len(pending) >= batch_size:
+                yield from flush(batch_size)
+        if pending:
+            yield from flush(len(pending))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,249 @@
+"""
+Local inference server: one model instance shared by every web worker.
+
+Run from the backend directory with
+    INFERENCE_SOCKET=/tmp/cropguard-infer.sock python -m services.inference_server
+(gunicorn.conf.py starts it automatically when INFERENCE_SOCKET is set).
+
+Workers never send pixels over the socket. Each client thread owns a
+shared-memory block; it writes the resized uint8 image into it and sends
+only the block name and shape. The server maps the block, queues a
+zero-copy view on the usual micro-batcher (which normalises straight into
+its batch buffer), writes the probabilities back into the same block and
+replies with a short status header.
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import threading
+import socketserver
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+try:
+    from ..config import get_config
+except ImportError:
+    from config import get_config
+
+# Request:  op (1 byte) | name length (H) | name | count, height, width, channels (4 x I)
+# Response: status (1 byte) | payload length (I) | payload
+_REQ = struct.Struct("!cH")
+_SHAPE = struct.Struct("!IIII")
+_RESP = struct.Struct("!cI")
+
+OP_PREDICT = b"P"
+OP_INFO = b"I"
+OK = b"K"
+NO_MODEL = b"N"
+ERROR = b"E"
+
+# Room for each output row after the pixels (float32 per class)
+_MAX_CLASSES = 4096
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("inference socket closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # The client owns the block; stop this process's tracker from unlinking it
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        from services import ai_service
+        blocks = {}
+        try:
+            while True:
+                try:
+                    op, name_len = _REQ.unpack(_recv_exact(self.request, _REQ.size))
+                except ConnectionError:
+                    return
+                if op == OP_INFO:
+                    info = json.dumps({
+                        "model_version": ai_service.model_version(),
+                        "ready": ai_service.load_model() is not None,
+                        "batcher": ai_service.batch_stats(),
+                        "status": ai_service.readiness()
+                    }).encode()
+                    self.request.sendall(_RESP.pack(OK, len(info)) + info)
+                    continue
+                name = _recv_exact(self.request, name_len).decode()
+                n, h, w, c = _SHAPE.unpack(_recv_exact(self.request, _SHAPE.size))
+                try:
+                    if name not in blocks:
+                        # A client thread uses one block at a time; drop the one it outgrew
+                        for old in blocks.values():
+                            old.close()
+                        blocks = {name: _attach(name)}
+                    shm = blocks[name]
+                    if ai_service.load_model() is None:
+                        self.request.sendall(_RESP.pack(NO_MODEL, 0))
+                        continue
+                    n_classes, version = self._predict(ai_service, shm, (n, h, w, c))
+                    version = version.encode()
+                    self.request.sendall(_RESP.pack(OK, n_classes) + struct.pack("!H", len(version)) + version)
+                except Exception as e:
+                    msg = str(e).encode()
+                    self.request.sendall(_RESP.pack(ERROR, len(msg)) + msg)
+        finally:
+            for shm in blocks.values():
+                shm.close()
+
+
+    @staticmethod
+    def _predict(ai_service, shm, shape):
+        # Views into the block must not outlive this call, or it cannot be closed
+        pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        probs, model = ai_service.predict_pixels(list(pixels))
+        out = np.ndarray(probs.shape, dtype=np.float32, buffer=shm.buf, offset=pixels.nbytes)
+        out[:] = probs
+        return probs.shape[1], model.version
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(socket_path):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    from services import ai_service
+    # This process owns the model; never route back to the socket
+    ai_service.run_in_process()
+    ai_service.warmup()
+    # Promotions reach the server through the registry, not the workers
+    ai_service.start_registry_watch()
+    server = _Server(socket_path, _Handler)
+    print(f"Inference server listening on {socket_path} (model {ai_service.model_version()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class InferenceClient:
+    """
+    Worker-side connection to the inference server
+
+    Each thread gets its own socket and shared-memory block, so requests
+    from concurrent threads in one worker can be batched by the server.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self._local = threading.local()
+        self._blocks = []
+        self._lock = threading.Lock()
+        self.model_version = None
+
+    def _conn(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _block(self, nbytes):
+        shm = getattr(self._local, "shm", None)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._local.shm = shm
+            with self._lock:
+                self._blocks.append(shm)
+        return shm
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def info(self):
+        sock = self._conn()
+        try:
+            sock.sendall(_REQ.pack(OP_INFO, 0))
+            status, n = _RESP.unpack(_recv_exact(sock, _RESP.size))
+            info = json.loads(_recv_exact(sock, n))
+        except Exception:
+            self._reset()
+            raise
+        self.model_version = info["model_version"]
+        return info
+
+    def predict(self, pixels):
+        """
+        (probabilities, model version) for one uint8 (H, W, 3) image, or
+        None if the server has no model loaded (callers then use the local
+        fallback)
+        """
+        reply = self.predict_many(pixels[np.newaxis])
+        return None if reply is None else (reply[0][0], reply[1])
+
+    def predict_many(self, pixels):
+        """(probability rows, model version) for a uint8 (N, H, W, 3) stack, or None without a model"""
+        count, h, w, c = pixels.shape
+        nbytes = count * h * w * c
+        shm = self._block(nbytes + 4 * count * _MAX_CLASSES)
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[:] = pixels
+        name = shm.name.encode()
+        sock = self._conn()
+        try:
+            sock.sendall(_REQ.pack(OP_PREDICT, len(name)) + name + _SHAPE.pack(count, h, w, c))
+            status, n = _RESP.unpack(_recv_exact(sock, _RESP.size))
+            if status == OK:
+                vlen = struct.unpack("!H", _recv_exact(sock, 2))[0]
+                # The version that produced these rows; another thread's reply may update the attribute next
+                version = _recv_exact(sock, vlen).decode()
+                self.model_version = version
+                return np.ndarray((count, n), dtype=np.float32, buffer=shm.buf, offset=nbytes).copy(), version
+            payload = _recv_exact(sock, n) if n and status == ERROR else b""
+        except Exception:
+            self._reset()
+            raise
+        if status == NO_MODEL:
+            return None
+        raise RuntimeError("inference server error: " + payload.decode(errors="replace"))
+
+    def close(self):
+        with self._lock:
+            for shm in self._blocks:
+                try:
+                    shm.close()
+                    shm.unlink()
+                except Exception:
+                    pass
+            self._blocks = []
+
+
+if __name__ == "__main__":
+    path = get_config()["INFERENCE_SOCKET"]
+    if not path:
+        sys.exit("Set INFERENCE_SOCKET to the Unix socket path to listen on")
+    # Let gunicorn's terminate() run serve()'s cleanup
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    serve(path)
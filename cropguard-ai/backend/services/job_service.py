@@ -0,0 +1,186 @@
+import time
+import heapq
+import uuid
+import queue
+import datetime
+import threading
+
+try:
+    from ..config import get_config
+    from ..models.repository import get_repository
+except ImportError:
+    from config import get_config
+    from models.repository import get_repository
+
+# Lower runs first; interactive jobs always overtake queued bulk jobs
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    """
+    In-process worker pool for async prediction jobs.
+
+    Jobs wait in a priority heap and run on `workers` threads, with at most
+    `bulk_concurrency` bulk jobs running at once so interactive jobs always
+    find a free worker. Every state change (queued, running, done, failed)
+    is written through the repository, so any web worker can answer
+    /api/jobs/<id>. The work itself (and its in-memory input) belongs to the
+    process that accepted the job; jobs left open by a process that died
+    are marked failed after stale_s. A janitor thread deletes finished jobs
+    after ttl_s.
+    """
+
+    def __init__(self, repo, workers=2, bulk_concurrency=1, max_queued=100,
+                 ttl_s=3600.0, stale_s=21600.0, cleanup_interval_s=60.0):
+        self.repo = repo
+        self.workers = max(1, int(workers))
+        self.bulk_concurrency = max(1, min(int(bulk_concurrency), self.workers))
+        self.max_queued = max(1, int(max_queued))
+        self.ttl = float(ttl_s)
+        self.stale = float(stale_s)
+        self.cleanup_interval = float(cleanup_interval_s)
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = {name: 0 for name in PRIORITIES}
+        self._counts = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0, "expired": 0}
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._janitor, name="job-janitor", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def submit(self, kind, fn, priority="interactive", owner=None):
+        """
+        Queue fn() (which returns a JSON-serialisable result) as a job
+
+        owner is the submitting session's email; only that session may
+        read the job back (None: any caller with the id, AUTH_REQUIRED=0)
+
+        Returns:
+            The job dictionary as stored
+
+        Raises:
+            ValueError: unknown priority
+            queue.Full: max_queued jobs are already waiting
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {sorted(PRIORITIES)}")
+        now = _now()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "priority": priority,
+            "owner": owner,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        with self._cond:
+            if len(self._heap) >= self.max_queued:
+                self._counts["rejected"] += 1
+                raise queue.Full
+        self.repo.put_job(job)
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (PRIORITIES[priority], self._seq, job, fn))
+            self._counts["submitted"] += 1
+            self._cond.notify()
+        return job
+
+    def _next(self):
+        with self._cond:
+            while True:
+                if self._heap:
+                    job = self._heap[0][2]
+                    # The top is only bulk when no interactive job waits
+                    if job["priority"] != "bulk" or self._running["bulk"] < self.bulk_concurrency:
+                        _, _, job, fn = heapq.heappop(self._heap)
+                        self._running[job["priority"]] += 1
+                        return job, fn
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job, fn = self._next()
+            now = _now()
+            job.update(status="running", started_at=now, updated_at=now)
+            try:
+                self.repo.put_job(job)
+                result = fn()
+                job.update(status="done", result=result)
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e}")
+                job.update(status="failed", error=str(e))
+            finally:
+                with self._cond:
+                    self._running[job["priority"]] -= 1
+                    self._counts[job["status"]] += 1
+                    self._cond.notify_all()
+            now = _now()
+            job.update(finished_at=now, updated_at=now)
+            try:
+                self.repo.put_job(job)
+            except Exception as e:
+                print(f"Could not store job {job['id']}: {e}")
+
+    def _janitor(self):
+        while True:
+            time.sleep(self.cleanup_interval)
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"Job cleanup failed: {e}")
+
+    def cleanup(self):
+        """Delete finished jobs older than ttl_s and fail jobs silent for stale_s"""
+        now = datetime.datetime.utcnow()
+        finished_before = (now - datetime.timedelta(seconds=self.ttl)).isoformat()
+        stale_before = (now - datetime.timedelta(seconds=self.stale)).isoformat()
+        removed, failed = self.repo.expire_jobs(finished_before, stale_before)
+        with self._cond:
+            self._counts["expired"] += removed
+        return removed, failed
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counts, queued=len(self._heap), running=dict(self._running),
+                        workers=self.workers, bulk_concurrency=self.bulk_concurrency)
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, starting its workers on first use"""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                config = get_config()
+                _jobs = JobQueue(
+                    get_repository(),
+                    workers=config["JOB_WORKERS"],
+                    bulk_concurrency=config["JOB_BULK_CONCURRENCY"],
+                    max_queued=config["JOB_MAX_QUEUED"],
+                    ttl_s=config["JOB_TTL_S"],
+                    stale_s=config["JOB_STALE_S"]
+                )
+    return _jobs
+
+
+def get_job(job_id):
+    return get_repository().get_job(job_id)
+
+
+def job_stats():
+    return _jobs.stats() if _jobs is not None else None
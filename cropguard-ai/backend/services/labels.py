@@ -0,0 +1,95 @@
+import threading
+
+# "Crop___Disease", as in the PlantVillage class directories
+SEPARATOR = "___"
+
+
+class LabelVocabulary:
+    """
+    Process-wide interning of class labels to compact integer ids.
+
+    Each label is split once into crop and disease ("Tomato___Late_blight"
+    -> "Tomato", "Late blight") and flagged healthy or not, so later
+    lookups are list indexing instead of string parsing. Ids are stable
+    for the life of the process only; anything persisted keeps the label.
+    """
+
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self.names = []
+        self.crops = []
+        self.diseases = []
+        self.healthy = []
+        for name in names:
+            self.id(name)
+
+    def id(self, name):
+        """Compact id for a label, interning it on first sight"""
+        i = self._ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(name)
+                if i is None:
+                    crop, sep, disease = name.partition(SEPARATOR)
+                    if not sep:
+                        crop, disease = "", name
+                    disease = disease.replace("_", " ").strip()
+                    i = len(self.names)
+                    self.names.append(name)
+                    self.crops.append(crop.replace("_", " ").strip())
+                    self.diseases.append(disease)
+                    self.healthy.append(disease.lower() == "healthy")
+                    # Published last, so a reader never sees an id before its splits
+                    self._ids[name] = i
+        return i
+
+    def __len__(self):
+        return len(self.names)
+
+
+VOCABULARY = LabelVocabulary()
+
+
+def label_id(name):
+    return VOCABULARY.id(name)
+
+
+class LabelSet:
+    """
+    Class labels of one model, in the order of its output rows.
+
+    ids[i] is the vocabulary id of output row i, so decoding a prediction
+    is argmax plus two list lookups.
+    """
+
+    def __init__(self, names, source=None):
+        names = [n.strip() for n in names if n.strip()]
+        if not names:
+            raise ValueError(f"no class labels in {source or 'label list'}")
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate class labels in {source or 'label list'}")
+        self.names = tuple(names)
+        self.ids = tuple(label_id(n) for n in names)
+        self.source = source
+
+    @classmethod
+    def from_file(cls, path):
+        """One label per line, as written by the training CLI (class_names.txt)"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read().splitlines(), source=path)
+
+    def validate(self, output_dim):
+        """
+        Raises:
+            ValueError: the model's output does not have one row per label
+        """
+        if output_dim is not None and int(output_dim) != len(self.names):
+            raise ValueError(
+                f"model outputs {output_dim} classes but {self.source or 'its class labels'} "
+                f"lists {len(self.names)}; retrain or ship the matching class_names.txt"
+            )
+        return self
+
+    def __len__(self):
+        return len(self.names)
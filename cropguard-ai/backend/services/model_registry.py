@@ -0,0 +1,354 @@
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: promotions from several processes are not serialised
+    fcntl = None
+
+try:
+    from ..config import get_config
+    from .labels import LabelSet
+except ImportError:
+    from config import get_config
+    from services.labels import LabelSet
+
+# Kept in step with model_runtime.ARTIFACT_EXTENSIONS; the admin API reads
+# the registry in API-only mode, where model_runtime (numpy) is not imported
+ARTIFACT_EXTENSIONS = {
+    "keras": ".h5",
+    "tflite": ".tflite",
+    "onnx": ".onnx",
+}
+CLASS_NAMES_FILE = "class_names.txt"
+MANIFEST_FILE = "manifest.json"
+_VERSION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(path, doc):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _output_dim(runtime, path):
+    # Imported here: the admin API reads the registry without numpy or a model runtime
+    try:
+        from .model_runtime import load_runtime
+    except ImportError:
+        from services.model_runtime import load_runtime
+    return int(load_runtime(runtime, path).output_dim)
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, versioned model artifacts.
+
+        <root>/versions/<version>/manifest.json    runtime, artifact, sha256 per file
+        <root>/versions/<version>/<artifact>       .h5, .tflite or .onnx
+        <root>/versions/<version>/class_names.txt
+        <root>/active.json                         {"version", "previous", "updated_at"}
+
+    A version is copied in under a temporary name and renamed into place,
+    and active.json is replaced atomically, so readers never see a partial
+    version or pointer. Serving processes poll active.json's mtime and swap
+    models when it changes (see ai_service.start_registry_watch).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.active_path = os.path.join(root, "active.json")
+
+    def _version_dir(self, version):
+        if not isinstance(version, str) or not _VERSION_NAME.match(version):
+            raise ValueError(f"invalid model version '{version}'")
+        return os.path.join(self.versions_dir, version)
+
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        fh = open(os.path.join(self.root, "registry.lock"), "a+")
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        return fh
+
+    # -- reading -------------------------------------------------------------
+
+    def manifest(self, version):
+        """
+        Raises:
+            ValueError: malformed or unknown version
+        """
+        try:
+            with open(os.path.join(self._version_dir(version), MANIFEST_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"unknown model version '{version}'")
+
+    def versions(self):
+        """Manifests of all registered versions, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        found = []
+        for entry in os.scandir(self.versions_dir):
+            if entry.is_dir() and _VERSION_NAME.match(entry.name):
+                try:
+                    found.append(self.manifest(entry.name))
+                except ValueError:
+                    # Being registered right now
+                    continue
+        return sorted(found, key=lambda m: m.get("created_at", ""))
+
+    def active(self):
+        """The active.json pointer, or None when nothing was promoted yet"""
+        try:
+            with open(self.active_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def stamp(self):
+        """Cheap change marker for active.json (None while it does not exist)"""
+        try:
+            st = os.stat(self.active_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def artifact_path(self, version):
+        manifest = self.manifest(version)
+        return os.path.join(self._version_dir(version), manifest["artifact"])
+
+    def class_names_path(self, version):
+        return os.path.join(self._version_dir(version), CLASS_NAMES_FILE)
+
+    def class_names(self, version):
+        with open(self.class_names_path(version), "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def verify(self, version):
+        """
+        Re-hash every file of a version against its manifest
+
+        Returns:
+            The manifest
+
+        Raises:
+            ValueError: unknown version, missing file or checksum mismatch
+        """
+        manifest = self.manifest(version)
+        root = self._version_dir(version)
+        for name, expected in manifest["sha256"].items():
+            path = os.path.join(root, name)
+            if not os.path.exists(path):
+                raise ValueError(f"model version '{version}' is missing {name}")
+            if _sha256(path) != expected:
+                raise ValueError(f"checksum mismatch for {name} in model version '{version}'")
+        return manifest
+
+    def check(self, version):
+        """
+        verify(), plus the class labels against the output size recorded
+        when the version was registered
+
+        Raises:
+            ValueError: as verify(), or labels that cannot decode the model
+        """
+        manifest = self.verify(version)
+        if "output_dim" not in manifest:
+            raise ValueError(f"model version '{version}' predates output checks; register it again")
+        LabelSet.from_file(self.class_names_path(version)).validate(manifest["output_dim"])
+        return manifest
+
+    # -- writing -------------------------------------------------------------
+
+    def register(self, artifact, class_names=None, runtime=None, version=None, notes=""):
+        """
+        Copy an artifact and its class_names.txt into a new version
+
+        The artifact is loaded once with its runtime to record its output
+        size, so a label file that does not match is rejected here rather
+        than when serving processes try to load it.
+
+        Args:
+            artifact: Model file (.h5, .tflite or .onnx)
+            class_names: class_names.txt to ship with it; defaults to the
+                one next to the artifact
+            runtime: keras | tflite | onnx; defaults from the extension
+            version: Version name; defaults to <UTC timestamp>-<sha prefix>
+
+        Returns:
+            The new version's manifest
+
+        Raises:
+            ValueError: unknown runtime, missing class names, labels that
+                do not match the model's output or an existing version name
+            ImportError: the runtime's package is not installed
+        """
+        ext = os.path.splitext(artifact)[1].lower()
+        if runtime is None:
+            runtime = next((name for name, e in ARTIFACT_EXTENSIONS.items() if e == ext), None)
+        if runtime not in ARTIFACT_EXTENSIONS:
+            raise ValueError(f"cannot tell the runtime of {artifact}; pass runtime=")
+        class_names = class_names or os.path.join(os.path.dirname(artifact) or ".", CLASS_NAMES_FILE)
+        if not os.path.exists(class_names):
+            raise ValueError(f"{class_names} not found; every version ships its class names")
+
+        artifact_digest = _sha256(artifact)
+        now = datetime.datetime.utcnow()
+        version = version or f"{now.strftime('%Y%m%d-%H%M%S')}-{artifact_digest[:8]}"
+        final = self._version_dir(version)
+        if os.path.exists(final):
+            raise ValueError(f"model version '{version}' already exists")
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp = f"{final}.{os.getpid()}.tmp"
+        os.makedirs(tmp)
+        try:
+            name = os.path.basename(artifact)
+            shutil.copyfile(artifact, os.path.join(tmp, name))
+            shutil.copyfile(class_names, os.path.join(tmp, CLASS_NAMES_FILE))
+            output_dim = _output_dim(runtime, os.path.join(tmp, name))
+            LabelSet.from_file(class_names).validate(output_dim)
+            manifest = {
+                "version": version,
+                "runtime": runtime,
+                "artifact": name,
+                "output_dim": output_dim,
+                "created_at": now.isoformat(),
+                "source": os.path.abspath(artifact),
+                "notes": notes,
+                "sha256": {
+                    name: artifact_digest,
+                    CLASS_NAMES_FILE: _sha256(os.path.join(tmp, CLASS_NAMES_FILE))
+                }
+            }
+            _write_json(os.path.join(tmp, MANIFEST_FILE), manifest)
+            os.rename(tmp, final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return manifest
+
+    def promote(self, version):
+        """
+        Make version the active one, remembering the current one for rollback()
+
+        The version is checked first (see check()), so a corrupted copy or
+        one whose labels do not fit the model is never promoted.
+
+        Returns:
+            The new active.json pointer
+        """
+        self.check(version)
+        fh = self._locked()
+        try:
+            current = self.active() or {}
+            previous = current.get("version")
+            if previous == version:
+                return current
+            pointer = {
+                "version": version,
+                "previous": previous,
+                "updated_at": datetime.datetime.utcnow().isoformat()
+            }
+            _write_json(self.active_path, pointer)
+            return pointer
+        finally:
+            fh.close()
+
+    def rollback(self):
+        """
+        Re-activate the previously active version
+
+        Raises:
+            ValueError: no previous version is recorded
+        """
+        current = self.active() or {}
+        if not current.get("previous"):
+            raise ValueError("no previous model version to roll back to")
+        return self.promote(current["previous"])
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the registry at MODEL_REGISTRY_DIR, or None when it is disabled"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                root = get_config()["MODEL_REGISTRY_DIR"]
+                if not root:
+                    return None
+                _registry = ModelRegistry(root)
+    return _registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the CropGuard model registry (MODEL_REGISTRY_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("register", help="copy an artifact and its class_names.txt into a new version")
+    add.add_argument("artifact")
+    add.add_argument("--class-names")
+    add.add_argument("--runtime", choices=sorted(ARTIFACT_EXTENSIONS))
+    add.add_argument("--version")
+    add.add_argument("--notes", default="")
+    add.add_argument("--promote", action="store_true", help="also make it the active version")
+    commands.add_parser("list", help="list versions and the active one")
+    promote = commands.add_parser("promote", help="make a version active")
+    promote.add_argument("version")
+    commands.add_parser("rollback", help="re-activate the previous version")
+    commands.add_parser("verify", help="re-check every version's checksums")
+    args = parser.parse_args(argv)
+
+    registry = get_registry()
+    if registry is None:
+        sys.exit("Set MODEL_REGISTRY_DIR to use the model registry")
+    try:
+        if args.command == "register":
+            manifest = registry.register(args.artifact, args.class_names, args.runtime, args.version, args.notes)
+            print(f"Registered {manifest['version']} ({manifest['runtime']})")
+            if args.promote:
+                registry.promote(manifest["version"])
+                print(f"Promoted {manifest['version']}")
+        elif args.command == "list":
+            active = (registry.active() or {}).get("version")
+            for manifest in registry.versions():
+                mark = "*" if manifest["version"] == active else " "
+                print(f"{mark} {manifest['version']:<32} {manifest['runtime']:<7} {manifest['created_at']}  {manifest.get('notes', '')}")
+        elif args.command == "promote":
+            print(json.dumps(registry.promote(args.version)))
+        elif args.command == "rollback":
+            print(json.dumps(registry.rollback()))
+        elif args.command == "verify":
+            for manifest in registry.versions():
+                registry.verify(manifest["version"])
+                print(f"OK {manifest['version']}")
+    except ValueError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
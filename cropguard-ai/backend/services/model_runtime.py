@@ -0,0 +1,126 @@
+import os
+import threading
+import numpy as np
+
+
+class KerasRuntime:
+    """Full TensorFlow/Keras model loaded from the .h5 artifact"""
+
+    name = "keras"
+
+    def __init__(self, path, threads=0):
+        import tensorflow as tf
+        if threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(threads)
+            except RuntimeError:
+                # Already fixed by an earlier load in this process (model swap)
+                pass
+        self.model = tf.keras.models.load_model(path)
+        self.output_dim = int(self.model.output_shape[-1])
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class TFLiteRuntime:
+    """
+    TensorFlow Lite interpreter (float32, float16 or int8-quantised artifacts)
+
+    Uses the standalone tflite_runtime package when installed, so a worker
+    can serve predictions without the full TensorFlow wheel.
+    """
+
+    name = "tflite"
+
+    def __init__(self, path, threads=0):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # tf.lite is a lazily loaded attribute, not an importable module
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=threads or None)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.output_dim = int(self._output["shape"][-1])
+        self._batch_size = int(self._input["shape"][0])
+        # The interpreter holds mutable tensor state
+        self._lock = threading.Lock()
+
+    def _resize(self, n):
+        if n != self._batch_size:
+            shape = [n] + list(self._input["shape"][1:])
+            self.interpreter.resize_tensor_input(self._input["index"], shape)
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = n
+
+    def predict(self, batch):
+        with self._lock:
+            self._resize(len(batch))
+            dtype = self._input["dtype"]
+            if dtype != np.float32:
+                # Integer input: quantise with the tensor's scale and zero point
+                scale, zero = self._input["quantization"]
+                info = np.iinfo(dtype)
+                batch = np.clip(np.round(batch / scale + zero), info.min, info.max).astype(dtype)
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self._output["index"])
+            if out.dtype != np.float32:
+                scale, zero = self._output["quantization"]
+                out = (out.astype(np.float32) - zero) * scale
+            return out
+
+
+class OnnxRuntime:
+    """ONNX Runtime CPU session"""
+
+    name = "onnx"
+
+    def __init__(self, path, threads=0):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input = self.session.get_inputs()[0].name
+        self.output_dim = int(self.session.get_outputs()[0].shape[-1])
+
+    def predict(self, batch):
+        return self.session.run(None, {self._input: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+RUNTIMES = {
+    "keras": KerasRuntime,
+    "tflite": TFLiteRuntime,
+    "onnx": OnnxRuntime,
+}
+
+ARTIFACT_EXTENSIONS = {
+    "keras": ".h5",
+    "tflite": ".tflite",
+    "onnx": ".onnx",
+}
+
+
+def artifact_path(model_path, runtime):
+    """Default artifact for a runtime: MODEL_PATH with the runtime's extension"""
+    return os.path.splitext(model_path)[0] + ARTIFACT_EXTENSIONS[runtime]
+
+
+def load_runtime(runtime, path, threads=0):
+    """
+    Instantiate a model runtime by name
+
+    Raises:
+        ValueError: unknown runtime name
+        ImportError: the runtime's package is not installed
+    """
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown MODEL_RUNTIME '{runtime}', expected one of {sorted(RUNTIMES)}")
+    return RUNTIMES[runtime](path, threads=threads)
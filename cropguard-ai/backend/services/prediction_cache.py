@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Two-tier cache of prediction results keyed by (model version, image sha256).
+
+    The memory tier is an LRU bounded to max_items entries. The disk tier
+    keeps one small JSON file per image under <disk_dir>/<model version>/,
+    so it survives restarts and is shared by all workers on the box.
+    Several versions coexist (workers swap models at slightly different
+    times, and a rollback should find its old entries again); files older
+    than max_age_s are pruned in the background at most once per
+    prune_interval_s.
+    """
+
+    def __init__(self, max_items=1024, disk_dir=None, max_age_s=7 * 86400, prune_interval_s=3600):
+        self.max_items = max(0, int(max_items))
+        self.disk_dir = disk_dir
+        self.max_age = float(max_age_s)
+        self.prune_interval = float(prune_interval_s)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._pruned = 0
+        self._next_prune = time.monotonic()
+
+    def _use_version(self, version):
+        # Only reported by stats(); entries are keyed by version
+        self._version = version
+
+    def _maybe_prune(self):
+        """Start a background prune if one is due (call with the lock held)"""
+        if not self.disk_dir or self.max_age <= 0 or time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + self.prune_interval
+        threading.Thread(target=self.prune, name="prediction-cache-prune", daemon=True).start()
+
+    def prune(self):
+        """Delete disk entries (and emptied version directories) older than max_age_s"""
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return 0
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for version in os.scandir(self.disk_dir):
+            if not version.is_dir():
+                continue
+            left = 0
+            for entry in os.scandir(version.path):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                    else:
+                        left += 1
+                except FileNotFoundError:
+                    # Another worker pruned it first
+                    pass
+            if not left:
+                try:
+                    os.rmdir(version.path)
+                except OSError:
+                    # Written to meanwhile
+                    pass
+        with self._lock:
+            self._pruned += removed
+        return removed
+
+    def _disk_path(self, version, digest):
+        return os.path.join(self.disk_dir, version, digest + ".json")
+
+    def get(self, version, digest):
+        with self._lock:
+            self._use_version(version)
+            res = self._lru.get((version, digest))
+            if res is not None:
+                self._lru.move_to_end((version, digest))
+                self._hits += 1
+                return dict(res)
+        res = None
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(version, digest), "r", encoding="utf-8") as f:
+                    res = json.load(f)
+            except (OSError, ValueError):
+                res = None
+        with self._lock:
+            if res is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._remember(version, digest, res)
+        return dict(res)
+
+    def put(self, version, digest, result):
+        with self._lock:
+            self._use_version(version)
+            self._remember(version, digest, dict(result))
+            self._maybe_prune()
+        if self.disk_dir:
+            path = self._disk_path(version, digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique per writer, so threads caching the same digest never share a temp file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=digest + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(result, f)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    def _remember(self, version, digest, result):
+        if not self.max_items:
+            return
+        self._lru[(version, digest)] = result
+        self._lru.move_to_end((version, digest))
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "model_version": self._version,
+                "memory_items": len(self._lru),
+                "max_items": self.max_items,
+                "memory_hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "disk_pruned": self._pruned,
+                "hit_ratio": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,99 @@
+import io
+import numpy as np
+from PIL import Image
+
+# Model input size (MobileNetV2)
+TARGET_SIZE = (224, 224)
+
+_SCALE = np.float32(255.0)
+
+
+def load_image(source, target_size=TARGET_SIZE):
+    """
+    Decode an image once, at roughly the size the model needs
+
+    Args:
+        source: Path, raw bytes, file-like object or PIL image
+        target_size: Final size the caller resizes to. JPEGs are decoded in
+            draft mode at the smallest DCT scale still at least this large,
+            so a 12MP photo is never decoded at full resolution.
+
+    Returns:
+        RGB PIL image
+    """
+    if isinstance(source, Image.Image):
+        return source if source.mode == 'RGB' else source.convert('RGB')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+    img.draft('RGB', target_size)
+    return img.convert('RGB')
+
+
+def load_thumbnail(source, size):
+    """
+    Decode straight to a small RGB thumbnail (aspect ratio kept)
+
+    Uses draft mode plus PIL's reducing resize, so the cost tracks the
+    thumbnail size rather than the photo's resolution.
+    """
+    img = load_image(source, size)
+    if img is source:
+        img = img.copy()
+    img.thumbnail(size)
+    return img
+
+
+def decode_resized(source, target_size=TARGET_SIZE):
+    """
+    Decode and resize to target_size, returning the raw uint8 (H, W, 3) pixels
+
+    Normalisation is deliberately left to normalize_into() so it can be done
+    once, straight into the batch buffer.
+    """
+    img = load_image(source, target_size)
+    if img.size != target_size:
+        img = img.resize(target_size)
+    return np.asarray(img)
+
+
+def normalize_into(images, out):
+    """
+    Scale uint8 images to [0, 1] float32 directly into out[:len(images)]
+
+    Each image is converted and divided in a single ufunc call writing into
+    its slot, so no float32 temporaries or stacked copies are created.
+    """
+    n = len(images)
+    for i in range(n):
+        np.divide(images[i], _SCALE, out=out[i])
+    return out[:n]
+
+
+class BatchBuffer:
+    """
+    Preallocated float32 model-input batch reused across forward passes
+
+    Only one thread may use a buffer at a time; the micro-batcher owns one
+    and fills it from its worker thread.
+    """
+
+    def __init__(self, capacity, target_size=TARGET_SIZE):
+        self.capacity = max(1, int(capacity))
+        self.buffer = np.empty((self.capacity, target_size[1], target_size[0], 3), dtype=np.float32)
+
+    def collate(self, images):
+        if len(images) > self.capacity:
+            # Larger than planned for; grow once rather than fail
+            self.capacity = len(images)
+            self.buffer = np.empty((self.capacity,) + self.buffer.shape[1:], dtype=np.float32)
+        return normalize_into(images, self.buffer)
+
+
+def preprocess_image(source, target_size=TARGET_SIZE):
+    """
+    Single-image model input: float32 array of shape (1, H, W, 3) in [0, 1]
+    """
+    out = np.empty((1, target_size[1], target_size[0], 3), dtype=np.float32)
+    normalize_into([decode_resized(source, target_size)], out)
+    return out
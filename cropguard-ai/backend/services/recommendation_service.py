@@ -1,114 +1,115 @@
-def recommend(disease, crop_type, severity):
+import json
+import threading
+
+try:
+    from ..config import get_config
+    from .labels import VOCABULARY, label_id
+except ImportError:
+    from config import get_config
+    from services.labels import VOCABULARY, label_id
+
+SEVERITIES = ("low", "medium", "high")
+
+
+def load_rules(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RecommendationTable:
     """
-    Generate treatment recommendations for crop diseases
-    Supports all 38 disease classes from the Plant Disease dataset
+    Treatment advice for every (class id, severity) pair.
+
+    Rows are indexed by labels.VOCABULARY id and built for every label
+    known when the table is created; a label seen later gets its row on
+    first use. Rules come from the JSON file at RECOMMENDATION_RULES and
+    are tried in order; a rule matches when any of its keywords occurs in
+    the lowercased disease part of the label ("Crop___Disease" -> "disease"
+    with spaces), or in the whole label for field "label". chemical_high
+    is appended for high severity. Severity suffixes follow: on high, none
+    when no chemical treatment applies, and the chemical one only after
+    advice that says "Apply" without a schedule. Only the crop note
+    depends on the request.
     """
-    organic = ""
-    chemical = ""
-    
-    # Extract crop and disease from the disease name (format: Crop___Disease)
-    if "___" in disease:
-        crop, disease_name = disease.split("___", 1)
-        crop = crop.replace("_", " ").replace("(", "").replace(")", "")
-        disease_name = disease_name.replace("_", " ")
-    else:
-        crop = crop_type if crop_type else "crop"
-        disease_name = disease
-    
-    # Check if healthy
-    if "healthy" in disease.lower():
-        organic = f"Continue good practices: balanced irrigation, crop rotation, and regular monitoring."
-        chemical = "No chemical treatment needed. Maintain preventive care."
-    
-    # Bacterial diseases
-    elif "bacterial" in disease_name.lower() or "spot" in disease_name.lower():
-        organic = f"Remove infected leaves, improve air circulation, apply copper-based organic sprays."
-        chemical = f"Use copper hydroxide or streptomycin sulfate. Apply every 7-10 days."
-        if severity == "high":
-            chemical += " Increase application frequency to every 5 days."
-    
-    # Fungal diseases - Blight
-    elif "blight" in disease_name.lower():
-        organic = f"Remove affected plant parts, avoid overhead watering, apply neem oil weekly."
-        chemical = f"Use chlorothalonil or mancozeb fungicide. Rotate with copper-based products."
-        if severity == "high":
-            chemical += " Apply preventively to surrounding plants."
-    
-    # Fungal diseases - Rust
-    elif "rust" in disease_name.lower():
-        organic = f"Improve air flow, remove infected leaves, spray sulfur-based fungicide."
-        chemical = f"Apply triazole or strobilurin fungicides. Rotate products to prevent resistance."
-    
-    # Fungal diseases - Mildew
-    elif "mildew" in disease_name.lower():
-        organic = f"Spray potassium bicarbonate solution, ensure good air circulation."
-        chemical = f"Use systemic fungicides like myclobutanil or propiconazole."
-        if severity == "high":
-            chemical += " Apply at first sign and repeat every 7-14 days."
-    
-    # Fungal diseases - Mold
-    elif "mold" in disease_name.lower():
-        organic = f"Reduce humidity, prune for better airflow, apply biological fungicides."
-        chemical = f"Use chlorothalonil or copper-based fungicides preventively."
-    
-    # Fungal diseases - Scab
-    elif "scab" in disease_name.lower():
-        organic = f"Remove fallen leaves, apply lime sulfur during dormancy, use resistant varieties."
-        chemical = f"Apply captan or myclobutanil at bud break and petal fall."
-    
-    # Fungal diseases - Black rot
-    elif "black rot" in disease_name.lower() or "rot" in disease_name.lower():
-        organic = f"Prune infected areas, improve drainage, apply bordeaux mixture."
-        chemical = f"Use mancozeb or captan fungicides. Start at bud break."
-    
-    # Fungal diseases - Leaf scorch
-    elif "scorch" in disease_name.lower():
-        organic = f"Ensure adequate watering, mulch to retain moisture, remove affected leaves."
-        chemical = f"Apply fungicides containing myclobutanil if fungal. Check for drought stress."
-    
-    # Viral diseases
-    elif "virus" in disease_name.lower() or "mosaic" in disease_name.lower() or "curl" in disease_name.lower():
-        organic = f"Remove and destroy infected plants immediately. Control insect vectors with neem oil."
-        chemical = f"No cure for viral diseases. Use insecticides to control aphids/whiteflies that spread virus."
+
+    def __init__(self, rules, classes=()):
+        self.rules = rules["rules"]
+        self.default = rules["default"]
+        self.severity = rules["severity"]
+        self.crop_note = rules["crop_note"]
+        self._rows = []
+        self._lock = threading.Lock()
+        for name in classes:
+            self._row(label_id(name))
+
+    def _row(self, class_id):
+        if class_id < len(self._rows):
+            return self._rows[class_id]
+        with self._lock:
+            # Ids are dense, so fill every row up to this one
+            while len(self._rows) <= class_id:
+                i = len(self._rows)
+                self._rows.append({severity: self._parts(i, severity) for severity in SEVERITIES})
+        return self._rows[class_id]
+
+    def _match(self, class_id):
+        name = VOCABULARY.diseases[class_id].lower()
+        label = VOCABULARY.names[class_id].lower()
+        for rule in self.rules:
+            text = label if rule.get("field") == "label" else name
+            if any(word in text for word in rule["match"]):
+                return rule
+        return self.default
+
+    def _parts(self, class_id, severity):
+        rule = self._match(class_id)
+        organic = rule["organic"]
+        chemical = rule["chemical"]
+        suffix = self.severity.get(severity, {})
         if severity == "high":
-            chemical += " Remove infected plants to prevent spread."
-    
-    # Pest-related (mites, etc.)
-    elif "mite" in disease_name.lower():
-        organic = f"Spray with insecticidal soap or neem oil. Introduce predatory mites."
-        chemical = f"Use miticides like abamectin or spiromesifen. Rotate products."
-    
-    # Citrus greening
-    elif "greening" in disease_name.lower() or "haunglongbing" in disease_name.lower():
-        organic = f"Remove infected trees, control psyllid vectors, use disease-free nursery stock."
-        chemical = f"No cure available. Apply systemic insecticides to control Asian citrus psyllid."
-    
-    # Esca (grape disease)
-    elif "esca" in disease_name.lower() or "measles" in disease_name.lower():
-        organic = f"Prune during dry weather, protect pruning wounds, remove infected wood."
-        chemical = f"Apply protective fungicides to pruning wounds. No curative treatment available."
-    
-    # Cercospora
-    elif "cercospora" in disease_name.lower():
-        organic = f"Practice crop rotation, remove crop debris, apply copper-based sprays."
-        chemical = f"Use azoxystrobin or propiconazole fungicides preventively."
-    
-    # Generic fallback for any other disease
-    else:
-        organic = f"Remove affected plant parts, improve cultural practices, apply organic fungicide."
-        chemical = f"Consult local extension service for specific fungicide recommendations."
-    
-    # Add severity-based modifications
-    if severity == "high" and "No chemical" not in chemical:
-        organic += f" Act immediately - disease is severe."
-        if "Apply" in chemical and "every" not in chemical:
-            chemical += " Apply thoroughly and repeat as needed."
-    elif severity == "medium":
-        organic += f" Monitor closely and treat promptly."
-    
-    # Add crop-specific note
-    if crop_type:
-        organic += f" Adjust timing for {crop_type} growth stage."
-    
-    return f"Organic: {organic} | Chemical: {chemical}"
+            chemical += rule.get("chemical_high", "")
+            if "No chemical" not in chemical:
+                organic += suffix.get("organic", "")
+                if "Apply" in chemical and "every" not in chemical:
+                    chemical += suffix.get("chemical", "")
+        else:
+            organic += suffix.get("organic", "")
+            chemical += suffix.get("chemical", "")
+        return "Organic: " + organic, " | Chemical: " + chemical
+
+    def recommend(self, disease, crop_type, severity, class_id=None):
+        if class_id is None:
+            class_id = label_id(disease)
+        row = self._row(class_id)
+        parts = row.get(severity)
+        if parts is None:
+            # Severities outside SEVERITIES
+            parts = self._parts(class_id, severity)
+        head, tail = parts
+        if crop_type:
+            return head + self.crop_note.format(crop_type=crop_type) + tail
+        return head + tail
+
+
+_table = None
+_table_lock = threading.Lock()
 
+
+def get_recommendation_table():
+    """Return the process-wide table, loading the rules file on first use"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                # Every label interned so far, i.e. those of the loaded model
+                _table = RecommendationTable(load_rules(get_config()["RECOMMENDATION_RULES"]), list(VOCABULARY.names))
+    return _table
+
+
+def recommend(disease, crop_type, severity, class_id=None):
+    """
+    Generate treatment recommendations for crop diseases
+    Supports any "Crop___Disease" label; pass the prediction's class_id
+    to skip the label lookup
+    """
+    return get_recommendation_table().recommend(disease, crop_type, severity, class_id)
@@ -1,9 +1,24 @@
 import os
-import uuid
+import atexit
+import hashlib
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 try:
     from ..config import get_config
+    from .phash import dhash, PerceptualIndex
 except ImportError:
     from config import get_config
+    from utils.phash import dhash, PerceptualIndex
+
+# data: uploaded bytes; path/name/digest: where the stored copy lives (an
+# earlier upload's when this one is a near-duplicate); phash: None if the
+# image could not be hashed
+Upload = namedtuple("Upload", ["data", "path", "name", "digest", "phash", "duplicate"])
+
+_phash_index = PerceptualIndex()
+_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-writer")
+atexit.register(_writer.shutdown, wait=True)
 
 def ensure_storage():
     path = get_config()["STORAGE_PATH"]
@@ -11,10 +26,65 @@ def ensure_storage():
         os.makedirs(path, exist_ok=True)
     return path
 
-def save_upload(file_storage):
+def read_upload(file_storage):
+    """
+    Read an upload into memory and work out where it is (or will be) stored,
+    without writing anything.
+
+    Files are content-addressed by SHA-256, so an exact re-upload maps to the
+    existing file. If the upload is a near-duplicate (perceptual hash within
+    PHASH_MAX_DISTANCE bits) of an earlier one, the earlier upload's path,
+    name and digest are used so the prediction cached for it is reused.
+    """
+    return read_upload_bytes(file_storage.read(), file_storage.filename)
+
+def read_upload_bytes(data, filename):
+    """read_upload() for image bytes that did not come from a form field"""
     base = ensure_storage()
-    ext = os.path.splitext(file_storage.filename)[1].lower()
-    name = str(uuid.uuid4()) + (ext if ext else ".jpg")
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename or "")[1].lower()
+    name = digest + (ext if ext else ".jpg")
     dest = os.path.join(base, name)
-    file_storage.save(dest)
-    return dest, name
+    if os.path.exists(dest):
+        return Upload(data, dest, name, digest, None, True)
+
+    max_dist = get_config()["PHASH_MAX_DISTANCE"]
+    h = None
+    if max_dist >= 0:
+        try:
+            h = dhash(data)
+        except Exception as e:
+            print(f"Could not hash upload: {e}")
+        if h is not None:
+            match = _phash_index.find(h, max_dist)
+            if match is not None and os.path.exists(os.path.join(base, match["name"])):
+                return Upload(data, os.path.join(base, match["name"]), match["name"], match["digest"], h, True)
+    return Upload(data, dest, name, digest, h, False)
+
+def _write_upload(upload):
+    if os.path.exists(upload.path):
+        return
+    # Unique per writer: request threads and the writer pool may store the same digest at once
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(upload.path), prefix=upload.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(upload.data)
+        os.replace(tmp, upload.path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    if upload.phash is not None:
+        _phash_index.add(upload.phash, upload.name, upload.digest)
+
+def persist_upload(upload):
+    """Write a new upload to storage on a background thread; returns a Future"""
+    if upload.duplicate:
+        return None
+    return _writer.submit(_write_upload, upload)
+
+def save_upload(file_storage):
+    """Synchronous read_upload + write. Returns (path, name, sha256 hex digest)."""
+    upload = read_upload(file_storage)
+    if not upload.duplicate:
+        _write_upload(upload)
+    return upload.path, upload.name, upload.digest
@@ -0,0 +1,31 @@
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access instead of now
+
+    Uses importlib's LazyLoader, so `bcrypt = lazy_import("bcrypt")` at
+    module level costs a spec lookup and the real import (and its
+    transitive imports) happens in the first request that needs it.
+
+    Raises:
+        ImportError: the module is not installed
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_available(name):
+    """True if the module can be imported, without importing it"""
+    return name in sys.modules or importlib.util.find_spec(name) is not None
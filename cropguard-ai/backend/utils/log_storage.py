@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: cross-process locking is unavailable, threads are still serialised
+    fcntl = None
+
+
+class LogStore:
+    """
+    Append-only JSON-lines store for one collection.
+
+    Each record is one line. Appends take an exclusive lock, write a single
+    line at the end of the file and only fsync every fsync_batch records or
+    fsync_interval_ms, so the write path is O(1) regardless of history.
+    An in-memory index of line offsets lets readers pick up only what other
+    processes appended since the last read. compact() atomically rewrites
+    the file, dropping torn lines left behind by a crash.
+    """
+
+    def __init__(self, path, fsync_batch=32, fsync_interval_ms=1000, compact_garbage=0.25):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = max(0.0, float(fsync_interval_ms)) / 1000.0
+        self.compact_garbage = compact_garbage
+        self._mutex = threading.RLock()
+        self._offsets = []
+        self._docs = []
+        self._keys = {}
+        self._size = 0
+        self._inode = None
+        self._garbage = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._fh = None
+
+    # -- locking -------------------------------------------------------------
+
+    def _lock(self, exclusive):
+        fh = open(self.lock_path, "a+")
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return fh
+
+    def _unlock(self, fh):
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+        fh.close()
+
+    # -- index maintenance ---------------------------------------------------
+
+    def _reset(self):
+        self._offsets = []
+        self._docs = []
+        self._keys = {}
+        self._size = 0
+        self._garbage = 0
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _refresh(self):
+        """Index any records appended since the last read (by any process)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            self._inode = None
+            return
+        if st.st_ino != self._inode or st.st_size < self._size:
+            # File was compacted or replaced underneath us
+            self._reset()
+            self._inode = st.st_ino
+        if st.st_size == self._size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._size)
+            offset = self._size
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Partial line from an in-flight append; pick it up next time
+                    break
+                line = raw.strip()
+                if line:
+                    try:
+                        doc = json.loads(line)
+                    except ValueError:
+                        self._garbage += 1
+                    else:
+                        self._index(offset, doc)
+                offset += len(raw)
+            self._size = offset
+
+    def _index(self, offset, doc):
+        self._offsets.append(offset)
+        self._docs.append(doc)
+        for key, values in self._keys.items():
+            values.add(doc.get(key))
+
+    def _key_values(self, key):
+        if key not in self._keys:
+            self._keys[key] = {d.get(key) for d in self._docs}
+        return self._keys[key]
+
+    # -- public API ----------------------------------------------------------
+
+    def load(self):
+        with self._mutex:
+            lk = self._lock(False)
+            try:
+                self._refresh()
+            finally:
+                self._unlock(lk)
+            return list(self._docs)
+
+    def tail(self, start):
+        """Records from position start onwards, without copying the whole log."""
+        with self._mutex:
+            lk = self._lock(False)
+            try:
+                self._refresh()
+            finally:
+                self._unlock(lk)
+            return self._docs[start:]
+
+    def iter_reversed(self, before=None):
+        """Yield (position, record) newest first, starting below position before."""
+        with self._mutex:
+            lk = self._lock(False)
+            try:
+                self._refresh()
+            finally:
+                self._unlock(lk)
+            # The list is only ever appended to or swapped out, so iterating it unlocked is safe
+            docs = self._docs
+        start = len(docs) if before is None else min(before, len(docs))
+        for i in range(start - 1, -1, -1):
+            yield i, docs[i]
+
+    def read(self, i):
+        """Random access to record i through the offset index."""
+        with self._mutex:
+            with open(self.path, "rb") as f:
+                f.seek(self._offsets[i])
+                return json.loads(f.readline())
+
+    def __len__(self):
+        with self._mutex:
+            return len(self._offsets)
+
+    def append(self, doc, unique_key=None):
+        """
+        Append one record. When unique_key is given the append is skipped
+        (and False returned) if a record with the same value already exists.
+        """
+        line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._mutex:
+            lk = self._lock(True)
+            try:
+                self._refresh()
+                if unique_key is not None and doc.get(unique_key) in self._key_values(unique_key):
+                    return False
+                if self._fh is None:
+                    self._fh = open(self.path, "ab")
+                    self._inode = os.fstat(self._fh.fileno()).st_ino
+                offset = self._fh.seek(0, os.SEEK_END)
+                if offset != self._size:
+                    # Torn tail from a crashed writer: terminate it so it reads as garbage
+                    self._fh.write(b"\n")
+                    offset += 1
+                    self._garbage += 1
+                self._fh.write(line)
+                self._fh.flush()
+                self._index(offset, doc)
+                self._size = offset + len(line)
+                self._pending += 1
+                if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+                if self._garbage and self._garbage > self.compact_garbage * max(1, len(self._docs)):
+                    self._compact(self._docs)
+            finally:
+                self._unlock(lk)
+        return True
+
+    def _sync(self):
+        if self._fh is not None and self._pending:
+            os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._mutex:
+            self._sync()
+
+    def _compact(self, docs):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for doc in docs:
+                f.write((json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._reset()
+        self._inode = None
+        self._pending = 0
+        self._refresh()
+
+    def compact(self, docs=None, rewrite=None):
+        """
+        Atomically rewrite the log, replacing its contents with docs if
+        given, or with rewrite(current docs) evaluated under the lock so
+        no concurrent append is lost.
+        """
+        with self._mutex:
+            lk = self._lock(True)
+            try:
+                if docs is None:
+                    self._refresh()
+                    docs = self._docs if rewrite is None else rewrite(list(self._docs))
+                self._compact(list(docs))
+            finally:
+                self._unlock(lk)
+
+    def seed(self, docs):
+        """Initialise a log that does not exist yet; no-op if another process won the race."""
+        with self._mutex:
+            lk = self._lock(True)
+            try:
+                if not os.path.exists(self.path):
+                    self._compact(list(docs))
+            finally:
+                self._unlock(lk)
+
+    def close(self):
+        with self._mutex:
+            self._sync()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path, **kwargs):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LogStore(path, **kwargs)
+        return store
+
+
+@atexit.register
+def _close_all():
+    for store in list(_stores.values()):
+        try:
+            store.close()
+        except Exception:
+            pass
@@ -0,0 +1,110 @@
+import io
+import threading
+from PIL import Image
+try:
+    from . import storage_utils
+except ImportError:
+    from utils import storage_utils
+
+
+def dhash(data, hash_size=8):
+    """
+    Difference hash of an encoded image as a hash_size*hash_size bit int.
+
+    The image is decoded at reduced size (JPEG draft mode), converted to
+    grayscale and shrunk to (hash_size + 1) x hash_size; each bit records
+    whether a pixel is brighter than its right-hand neighbour. Recompressed
+    or re-shot photos of the same leaf land within a few bits of each other.
+    """
+    img = Image.open(io.BytesIO(data))
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    img = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    px = list(img.getdata())
+    value = 0
+    for row in range(hash_size):
+        base = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (px[base + col] > px[base + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, h, value):
+        node = self.root
+        if node is None:
+            self.root = [h, value, {}]
+            self.size = 1
+            return
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, value, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, h, max_dist):
+        """(distance, value) pairs within max_dist of h, closest first"""
+        out = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_dist:
+                out.append((d, node[1]))
+            # Triangle inequality: only subtrees at distance d +/- max_dist can match
+            for k, child in node[2].items():
+                if d - max_dist <= k <= d + max_dist:
+                    stack.append(child)
+        out.sort(key=lambda x: x[0])
+        return out
+
+
+class PerceptualIndex:
+    """
+    Near-duplicate index of stored uploads.
+
+    Entries are appended to the "phash_index" JSON-lines log so every worker
+    sees them; each process folds new log records into its own BK-tree
+    before a lookup.
+    """
+
+    def __init__(self, name="phash_index"):
+        self.name = name
+        self._tree = BKTree()
+        self._folded = 0
+        self._lock = threading.Lock()
+
+    def _catch_up(self):
+        new = storage_utils.tail(self.name, self._folded)
+        for rec in new:
+            self._tree.add(int(rec["hash"], 16), rec)
+        self._folded += len(new)
+
+    def find(self, h, max_dist):
+        """Closest indexed upload within max_dist bits, or None"""
+        with self._lock:
+            self._catch_up()
+            matches = self._tree.search(h, max_dist)
+        return matches[0][1] if matches else None
+
+    def add(self, h, name, digest):
+        storage_utils.append(self.name, {"hash": format(h, "016x"), "name": name, "digest": digest})
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return self._tree.size
@@ -2,8 +2,10 @@ import os
 import json
 try:
     from ..config import get_config
+    from .log_storage import get_store
 except ImportError:
     from config import get_config
+    from utils.log_storage import get_store
 
 def _base():
     path = get_config()["STORAGE_PATH"]
@@ -13,14 +15,46 @@ def _base():
 def _file(name):
     return os.path.join(_base(), name + ".json")
 
+def _store(name):
+    config = get_config()
+    path = os.path.join(_base(), name + ".jsonl")
+    store = get_store(
+        path,
+        fsync_batch=config["STORAGE_FSYNC_BATCH"],
+        fsync_interval_ms=config["STORAGE_FSYNC_INTERVAL_MS"]
+    )
+    if not os.path.exists(path):
+        _migrate(name, store)
+    return store
+
+def _migrate(name, store):
+    """One-time import of the legacy whole-file <name>.json into the log."""
+    legacy = _file(name)
+    if os.path.exists(legacy):
+        with open(legacy, "r", encoding="utf-8") as f:
+            store.seed(json.load(f))
+
+def exists(name):
+    """Whether a collection has a log or legacy file, without creating either."""
+    path = get_config()["STORAGE_PATH"]
+    return any(os.path.exists(os.path.join(path, name + ext)) for ext in (".jsonl", ".json"))
+
 def load(name):
-    fp = _file(name)
-    if not os.path.exists(fp):
-        return []
-    with open(fp, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _store(name).load()
+
+def tail(name, start):
+    return _store(name).tail(start)
+
+def iter_reversed(name, before=None):
+    return _store(name).iter_reversed(before)
 
 def save(name, data):
-    fp = _file(name)
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Whole-collection rewrite; goes through an atomic compaction of the log
+    _store(name).compact(data)
+
+def rewrite(name, fn):
+    # Read-modify-write of a whole collection under the store's exclusive lock
+    _store(name).compact(rewrite=fn)
+
+def append(name, doc, unique_key=None):
+    return _store(name).append(doc, unique_key=unique_key)
@@ -0,0 +1,121 @@
+"""
+CropGuard AI - Fallback classifier benchmark
+Compares the original full-resolution fallback feature extraction against
+the thumbnail-based ai_service.fallback_prediction.
+
+Usage (from cropguard-ai/):
+    python benchmarks/bench_fallback.py
+    python benchmarks/bench_fallback.py --synthetic-mp 12 --repeat 5
+
+Each variant runs in its own subprocess so peak RSS is measured cleanly.
+The new variant is given raw bytes without a digest, so the cost of
+hashing the upload is included.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_preprocess import load_inputs
+
+
+def legacy_features(image_path):
+    # Verbatim copy of the feature and hash part of the original fallback_prediction
+    img = Image.open(image_path).convert('RGB')
+    img_array = np.array(img, dtype=np.float32)
+
+    mean_r = float(img_array[:, :, 0].mean())
+    mean_g = float(img_array[:, :, 1].mean())
+    mean_b = float(img_array[:, :, 2].mean())
+    std_r = float(img_array[:, :, 0].std())
+    std_g = float(img_array[:, :, 1].std())
+    std_b = float(img_array[:, :, 2].std())
+
+    brightness = (mean_r + mean_g + mean_b) / 3.0
+    variation = (std_r + std_g + std_b) / 3.0
+    green_dominance = mean_g - (mean_r + mean_b) / 2.0
+
+    img_hash = hashlib.md5(img_array.tobytes()).hexdigest()
+    hash_val = int(img_hash[:8], 16) % 100
+    return brightness, variation, green_dominance, hash_val
+
+
+def run_variant(name, args):
+    if name == "legacy":
+        def fn(data):
+            return legacy_features(io.BytesIO(data))
+    else:
+        from services.ai_service import fallback_prediction
+
+        def fn(data):
+            return fallback_prediction(data)
+    inputs = load_inputs(args)
+    # Warm up imports and codecs
+    first = fn(inputs[0][1])
+    deterministic = fn(inputs[0][1]) == first
+    times = []
+    tracemalloc.start()
+    for _ in range(args.repeat):
+        for _, data in inputs:
+            t0 = time.perf_counter()
+            fn(data)
+            times.append(time.perf_counter() - t0)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "variant": name,
+        "images": len(inputs),
+        "calls": len(times),
+        "mean_ms": 1000 * sum(times) / len(times),
+        "p50_ms": 1000 * times[len(times) // 2],
+        "p95_ms": 1000 * times[int(len(times) * 0.95) - 1],
+        "numpy_peak_mb": traced_peak / 2 ** 20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "deterministic": deterministic
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=os.path.join(ROOT, "storage"))
+    parser.add_argument("--synthetic-mp", type=float, default=0, help="benchmark one synthetic JPEG of this many megapixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--variant", choices=["legacy", "thumbnail"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args)))
+        return
+
+    results = []
+    for variant in ("legacy", "thumbnail"):
+        cmd = [sys.executable, __file__, "--variant", variant, "--images", args.images,
+               "--synthetic-mp", str(args.synthetic_mp), "--repeat", str(args.repeat)]
+        results.append(json.loads(subprocess.check_output(cmd).decode().strip().splitlines()[-1]))
+
+    print(f"{'variant':<11}{'images':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'numpy MB':>10}{'RSS MB':>10}  stable")
+    for r in results:
+        print(f"{r['variant']:<11}{r['images']:>8}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['numpy_peak_mb']:>10.1f}{r['max_rss_mb']:>10.1f}  {'yes' if r['deterministic'] else 'NO'}")
+    legacy, new = results
+    print(f"\nspeedup: {legacy['mean_ms'] / new['mean_ms']:.2f}x   "
+          f"numpy peak: {legacy['numpy_peak_mb'] / max(new['numpy_peak_mb'], 1e-6):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+CropGuard AI - Cold start import benchmark
+Imports backend/app.py in a fresh interpreter under `python -X importtime`
+for each APP_MODE and reports total import time plus the slowest modules.
+
+Usage (from cropguard-ai/):
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --modes api --budget-ms 400 --top 15
+
+Exits non-zero when any mode's app import exceeds --budget-ms, so it can
+gate cold-start regressions in CI. Storage goes to a temporary directory
+and model warmup is disabled, so only imports are measured.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+# Modules that an "api" process should never import
+HEAVY = ("tensorflow", "numpy", "PIL", "bcrypt", "pymongo")
+
+
+def parse_importtime(stderr):
+    """[(cumulative_us, self_us, depth, module)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), int(self_us), depth, name.strip()))
+    return rows
+
+
+def app_children(rows):
+    """Direct imports of the app module (importtime lists children before their parent)"""
+    end = max(i for i, row in enumerate(rows) if row[2] == 0 and row[3] == "app")
+    start = end
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    return [row for row in rows[start:end] if row[2] == 1]
+
+
+def run_mode(mode, storage):
+    env = dict(os.environ, APP_MODE=mode, STORAGE_PATH=storage, MODEL_EAGER_LOAD="0")
+    code = ("import sys, time; t = time.perf_counter(); import app; "
+            "print((time.perf_counter() - t) * 1000); "
+            f"print('heavy:' + ','.join(m for m in {HEAVY!r} if type(sys.modules.get(m)).__name__ == 'module'))")
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND, env=env,
+                          capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    lines = proc.stdout.strip().splitlines()
+    return {
+        "mode": mode,
+        "app_import_ms": float(lines[-2]),
+        "process_ms": wall_ms,
+        "heavy_loaded": [m for m in lines[-1][len("heavy:"):].split(",") if m],
+        "modules": parse_importtime(proc.stderr)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="api,full", help="comma-separated APP_MODE values")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if an app import takes longer")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as storage:
+        for mode in args.modes.split(","):
+            r = run_mode(mode.strip(), storage)
+            print(f"== APP_MODE={r['mode']}: import app {r['app_import_ms']:.1f} ms, "
+                  f"process {r['process_ms']:.1f} ms, heavy modules loaded: {', '.join(r['heavy_loaded']) or 'none'}")
+            top = sorted(app_children(r["modules"]), reverse=True)[:args.top]
+            print(f"   {'cumulative ms':>14}{'self ms':>10}  module")
+            for cumulative, self_us, _, name in top:
+                print(f"   {cumulative / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+            if args.budget_ms and r["app_import_ms"] > args.budget_ms:
+                print(f"   over budget ({args.budget_ms:.0f} ms)")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+CropGuard AI - Training input pipeline benchmark
+Measures images/sec delivered by ImageDataGenerator.flow_from_directory
+(what the training scripts used) and by the tf.data pipeline in
+training/data.py, uncached and from its file cache.
+
+Usage (from cropguard-ai/):
+    python benchmarks/bench_input_pipeline.py --data-dir dataset/train --batches 200
+    python benchmarks/bench_input_pipeline.py --synthetic 2000
+
+Only the input side is timed: batches are pulled and discarded, no model
+runs. --synthetic writes that many 256x256 JPEGs (the PlantVillage size)
+across 38 classes to a temporary directory first.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_synthetic(directory, count, classes=38, size=256):
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        class_dir = os.path.join(directory, f"class_{i % classes:02d}")
+        os.makedirs(class_dir, exist_ok=True)
+        # Smooth noise compresses like a leaf photo rather than like static
+        small = rng.integers(0, 255, (size // 16, size // 16, 3), dtype=np.uint8)
+        Image.fromarray(small).resize((size, size)).save(os.path.join(class_dir, f"{i}.jpg"), quality=90)
+
+
+def drain(iterator, batches):
+    """images/sec over batches batches, after one warm-up batch"""
+    next(iterator)
+    images = 0
+    started = time.perf_counter()
+    for _ in range(batches):
+        x, _ = next(iterator)
+        images += int(x.shape[0])
+    return images / (time.perf_counter() - started)
+
+
+def bench_generator(args):
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+    datagen = ImageDataGenerator(
+        rescale=1./255,
+        rotation_range=30,
+        width_shift_range=0.2,
+        height_shift_range=0.2,
+        shear_range=0.2,
+        zoom_range=0.2,
+        horizontal_flip=True,
+        vertical_flip=True,
+        fill_mode='nearest'
+    )
+    flow = datagen.flow_from_directory(args.data_dir, target_size=(args.image_size, args.image_size),
+                                       batch_size=args.batch_size, class_mode='categorical', shuffle=True)
+    return drain(iter(flow), args.batches)
+
+
+def bench_tfdata(args, cache_dir):
+    from training.data import load_split
+    split = load_split(args.data_dir, image_size=(args.image_size, args.image_size),
+                       batch_size=args.batch_size, training=True, cache_dir=cache_dir)
+    ds = split.dataset.repeat()
+    if cache_dir:
+        # Fill the cache with one full pass, then time reads from it
+        for _ in split.dataset:
+            pass
+    return drain(iter(ds), args.batches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="split directory with one sub-directory per class")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate this many images instead")
+    parser.add_argument("--batches", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--image-size", type=int, default=224)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="cropguard-bench-")
+    try:
+        if args.synthetic:
+            args.data_dir = os.path.join(scratch, "train")
+            make_synthetic(args.data_dir, args.synthetic)
+        elif not args.data_dir:
+            parser.error("--data-dir or --synthetic is required")
+
+        results = [
+            ("ImageDataGenerator", bench_generator(args)),
+            ("tf.data", bench_tfdata(args, None)),
+            ("tf.data (cached)", bench_tfdata(args, os.path.join(scratch, "cache")))
+        ]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\n{'pipeline':<22}{'images/s':>12}{'speedup':>10}  ({os.cpu_count()} CPUs, batch {args.batch_size})")
+    base = results[0][1]
+    for name, rate in results:
+        print(f"{name:<22}{rate:>12.1f}{rate / base:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
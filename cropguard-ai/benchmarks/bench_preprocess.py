@@ -0,0 +1,111 @@
+"""
+CropGuard AI - Preprocessing benchmark
+Compares the original full-decode preprocess_image against the draft-mode
+pipeline in backend/services/preprocess.py.
+
+Usage (from cropguard-ai/):
+    python benchmarks/bench_preprocess.py
+    python benchmarks/bench_preprocess.py --synthetic-mp 12 --repeat 5
+
+Each variant runs in its own subprocess so peak RSS is measured cleanly.
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+
+def legacy_preprocess(image_path, target_size=(224, 224)):
+    # Verbatim copy of the pre-pipeline ai_service.preprocess_image
+    img = Image.open(image_path).convert('RGB')
+    img = img.resize(target_size)
+    img_array = np.array(img, dtype=np.float32)
+    img_array = img_array / 255.0
+    img_array = np.expand_dims(img_array, axis=0)
+    return img_array
+
+
+def load_inputs(args):
+    if args.synthetic_mp:
+        # Noise compresses badly, so this is a worst case for decode time
+        side = int((args.synthetic_mp * 1e6) ** 0.5)
+        rng = np.random.default_rng(0)
+        small = rng.integers(0, 255, (side // 8, side // 8, 3), dtype=np.uint8)
+        img = Image.fromarray(small).resize((side, side))
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=90)
+        return [("synthetic", buf.getvalue())]
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")))
+    return [(os.path.basename(p), open(p, "rb").read()) for p in paths]
+
+
+def run_variant(name, args):
+    from services.preprocess import preprocess_image
+    fn = legacy_preprocess if name == "legacy" else preprocess_image
+    inputs = load_inputs(args)
+    # Warm up imports and codecs
+    fn(io.BytesIO(inputs[0][1]))
+    times = []
+    tracemalloc.start()
+    for _ in range(args.repeat):
+        for _, data in inputs:
+            t0 = time.perf_counter()
+            fn(io.BytesIO(data))
+            times.append(time.perf_counter() - t0)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "variant": name,
+        "images": len(inputs),
+        "calls": len(times),
+        "mean_ms": 1000 * sum(times) / len(times),
+        "p50_ms": 1000 * times[len(times) // 2],
+        "p95_ms": 1000 * times[int(len(times) * 0.95) - 1],
+        "numpy_peak_mb": traced_peak / 2 ** 20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=os.path.join(ROOT, "storage"))
+    parser.add_argument("--synthetic-mp", type=float, default=0, help="benchmark one synthetic JPEG of this many megapixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--variant", choices=["legacy", "pipeline"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args)))
+        return
+
+    results = []
+    for variant in ("legacy", "pipeline"):
+        cmd = [sys.executable, __file__, "--variant", variant, "--images", args.images,
+               "--synthetic-mp", str(args.synthetic_mp), "--repeat", str(args.repeat)]
+        results.append(json.loads(subprocess.check_output(cmd).decode().strip().splitlines()[-1]))
+
+    print(f"{'variant':<10}{'images':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'numpy MB':>10}{'RSS MB':>10}")
+    for r in results:
+        print(f"{r['variant']:<10}{r['images']:>8}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['numpy_peak_mb']:>10.1f}{r['max_rss_mb']:>10.1f}")
+    legacy, new = results
+    print(f"\nspeedup: {legacy['mean_ms'] / new['mean_ms']:.2f}x   "
+          f"numpy peak: {legacy['numpy_peak_mb'] / max(new['numpy_peak_mb'], 1e-6):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
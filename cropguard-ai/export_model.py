@@ -0,0 +1,181 @@
+"""
+CropGuard AI - Model Export Script
+Convert model/crop_disease_model.h5 into a TFLite or ONNX artifact for the
+lighter serving runtimes, optionally quantised, and check it still agrees
+with the Keras model.
+
+Examples (from cropguard-ai/):
+    python export_model.py --format tflite --quantize int8 --calibration-dir dataset/train
+    python export_model.py --format tflite --quantize float16
+    python export_model.py --format onnx --quantize dynamic
+    python export_model.py --parity-only --artifact model/crop_disease_model.tflite
+
+Serve the result with MODEL_RUNTIME=tflite (or onnx).
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from services.preprocess import preprocess_image
+from services.model_runtime import load_runtime, artifact_path
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.JPG", "*.JPEG", "*.PNG")
+
+
+def list_images(directory, limit, seed=0):
+    """Up to limit images found anywhere under directory, sampled reproducibly"""
+    paths = []
+    for pattern in IMAGE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+    paths = sorted(set(paths))
+    random.Random(seed).shuffle(paths)
+    return paths[:limit]
+
+
+def representative_dataset(paths):
+    def gen():
+        for p in paths:
+            yield [preprocess_image(p)]
+    return gen
+
+
+def export_tflite(model, output, quantize, calibration):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantize == "int8":
+        if not calibration:
+            sys.exit("int8 quantisation needs calibration images (--calibration-dir)")
+        # Full integer quantisation; float input/output keeps the serving code unchanged
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+
+
+class _CalibrationReader:
+    """onnxruntime.quantization CalibrationDataReader over image paths"""
+
+    def __init__(self, input_name, paths):
+        self.input_name = input_name
+        self._it = iter(paths)
+
+    def get_next(self):
+        p = next(self._it, None)
+        return None if p is None else {self.input_name: preprocess_image(p)}
+
+
+def export_onnx(model, output, quantize, calibration):
+    import tensorflow as tf
+    import tf2onnx
+    spec = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input"),)
+    float_path = output if quantize == "none" else output + ".float.onnx"
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=float_path)
+    if quantize == "none":
+        return
+    from onnxruntime import quantization as q
+    if quantize == "dynamic":
+        q.quantize_dynamic(float_path, output, weight_type=q.QuantType.QInt8)
+    elif quantize == "int8":
+        if not calibration:
+            sys.exit("int8 quantisation needs calibration images (--calibration-dir)")
+        q.quantize_static(float_path, output, _CalibrationReader("input", calibration),
+                          activation_type=q.QuantType.QInt8, weight_type=q.QuantType.QInt8)
+    else:
+        sys.exit(f"--quantize {quantize} is not supported for ONNX (use none, dynamic or int8)")
+    os.remove(float_path)
+
+
+def parity_check(keras_path, artifact, runtime, paths, batch_size=16):
+    """Top-1 agreement and probability drift of artifact vs the Keras model"""
+    reference = load_runtime("keras", keras_path)
+    candidate = load_runtime(runtime, artifact)
+    agree = 0
+    max_diff = 0.0
+    t_ref = t_cand = 0.0
+    for i in range(0, len(paths), batch_size):
+        batch = np.concatenate([preprocess_image(p) for p in paths[i:i + batch_size]])
+        t0 = time.perf_counter()
+        ref = reference.predict(batch)
+        t1 = time.perf_counter()
+        cand = candidate.predict(batch)
+        t2 = time.perf_counter()
+        t_ref += t1 - t0
+        t_cand += t2 - t1
+        agree += int((ref.argmax(axis=1) == cand.argmax(axis=1)).sum())
+        max_diff = max(max_diff, float(np.abs(ref - cand).max()))
+    n = len(paths)
+    return {
+        "artifact": artifact,
+        "runtime": runtime,
+        "images": n,
+        "top1_agreement": agree / n if n else 0.0,
+        "max_prob_diff": max_diff,
+        "keras_ms_per_image": 1000 * t_ref / n if n else 0.0,
+        "runtime_ms_per_image": 1000 * t_cand / n if n else 0.0,
+        "artifact_mb": os.path.getsize(artifact) / 2 ** 20,
+        "keras_mb": os.path.getsize(keras_path) / 2 ** 20
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(ROOT, "model", "crop_disease_model.h5"))
+    parser.add_argument("--format", choices=["tflite", "onnx"], default="tflite")
+    parser.add_argument("--quantize", choices=["none", "float16", "dynamic", "int8"], default="none")
+    parser.add_argument("--output", help="artifact path (default: model path with the format's extension)")
+    parser.add_argument("--calibration-dir", help="directory of representative images for int8")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--parity-dir", help="images for the parity check (default: calibration dir, else storage/)")
+    parser.add_argument("--parity-samples", type=int, default=500)
+    parser.add_argument("--parity-only", action="store_true", help="skip export, only compare --artifact")
+    parser.add_argument("--artifact", help="artifact to compare with --parity-only")
+    parser.add_argument("--min-agreement", type=float, default=0.0, help="exit non-zero below this top-1 agreement")
+    parser.add_argument("--report", help="write the parity report as JSON to this path")
+    args = parser.parse_args()
+
+    output = args.artifact or args.output or artifact_path(args.model, args.format)
+    runtime = "onnx" if output.endswith(".onnx") else "tflite"
+
+    if not args.parity_only:
+        import tensorflow as tf
+        print(f"Loading {args.model}")
+        model = tf.keras.models.load_model(args.model)
+        calibration = list_images(args.calibration_dir, args.calibration_samples) if args.calibration_dir else []
+        print(f"Exporting {args.format} ({args.quantize}) -> {output}")
+        if args.format == "tflite":
+            export_tflite(model, output, args.quantize, calibration)
+        else:
+            export_onnx(model, output, args.quantize, calibration)
+        print(f"Saved {output} ({os.path.getsize(output) / 2 ** 20:.1f} MB)")
+
+    parity_dir = args.parity_dir or args.calibration_dir or os.path.join(ROOT, "storage")
+    paths = list_images(parity_dir, args.parity_samples, seed=1)
+    if not paths:
+        sys.exit(f"No images found under {parity_dir} for the parity check")
+    report = parity_check(args.model, output, runtime, paths)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["top1_agreement"] < args.min_agreement:
+        sys.exit(f"Top-1 agreement {report['top1_agreement']:.3f} is below --min-agreement {args.min_agreement}")
+
+
+if __name__ == "__main__":
+    main()
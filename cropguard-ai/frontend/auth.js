@@ -56,6 +56,7 @@ btnAuth.onclick = async () => {
 
         // Store user info and redirect to dashboard
         localStorage.setItem("email", email)
+        localStorage.setItem("token", j.token)
         localStorage.setItem("userName", name || email.split("@")[0])
         window.location.href = "dashboard.html"
     } catch (e) {
@@ -65,6 +66,6 @@ btnAuth.onclick = async () => {
 
 // Check if already logged in
 const existingEmail = localStorage.getItem("email")
-if (existingEmail) {
+if (existingEmail && localStorage.getItem("token")) {
     window.location.href = "dashboard.html"
 }
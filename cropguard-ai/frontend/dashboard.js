@@ -11,9 +11,10 @@ const resultEl = document.getElementById("result")
 
 // Check authentication
 const email = localStorage.getItem("email")
+const token = localStorage.getItem("token")
 const userName = localStorage.getItem("userName")
 
-if (!email) {
+if (!email || !token) {
     window.location.href = "index.html"
 }
 
@@ -23,6 +24,7 @@ userEmailEl.textContent = userName || email
 // Logout functionality
 btnLogout.onclick = () => {
     localStorage.removeItem("email")
+    localStorage.removeItem("token")
     localStorage.removeItem("userName")
     window.location.href = "index.html"
 }
@@ -68,8 +70,14 @@ btnPredict.onclick = async () => {
     try {
         const r = await fetch(API + "/api/predict", {
             method: "POST",
+            headers: { "Authorization": "Bearer " + token },
             body: fd
         })
+        if (r.status === 401) {
+            // Session expired: log in again
+            btnLogout.onclick()
+            return
+        }
         const j = await r.json()
 
         if (!r.ok) {
@@ -0,0 +1,47 @@
+"""
+Gunicorn hooks for CropGuard AI (loaded automatically from this directory)
+
+When INFERENCE_SOCKET is set, the master starts one inference server
+process before forking workers, so the model is loaded once per box
+rather than once per worker, and stops it on shutdown.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND)
+
+from config import get_config
+
+_server = None
+
+
+def on_starting(server):
+    global _server
+    config = get_config()
+    socket_path = config["INFERENCE_SOCKET"]
+    if not socket_path:
+        return
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    _server = subprocess.Popen([sys.executable, "-m", "services.inference_server"], cwd=BACKEND)
+    # Workers fall back to feature-based predictions until the socket appears
+    deadline = time.monotonic() + config["INFERENCE_SERVER_START_TIMEOUT"]
+    while not os.path.exists(socket_path) and time.monotonic() < deadline:
+        if _server.poll() is not None:
+            server.log.error("Inference server exited with code %s", _server.returncode)
+            return
+        time.sleep(0.1)
+    server.log.info("Inference server ready on %s (pid %s)", socket_path, _server.pid)
+
+
+def on_exit(server):
+    if _server is not None and _server.poll() is None:
+        _server.terminate()
+        try:
+            _server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _server.kill()
@@ -0,0 +1,33 @@
+"""
+recommend() must keep returning exactly what the original if/elif chain did.
+
+fixtures/recommendation_golden.json was generated from that original
+function (see its "generated_from") for every class label plus unknown
+ones, every severity and a few crop types; regenerate it only when a
+recommendation is meant to change.
+"""
+import os
+import sys
+import json
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir, "backend"))
+
+from services.labels import label_id  # noqa: E402
+from services.recommendation_service import recommend  # noqa: E402
+
+with open(os.path.join(HERE, "fixtures", "recommendation_golden.json"), "r", encoding="utf-8") as f:
+    CASES = json.load(f)["cases"]
+
+
+@pytest.mark.parametrize("disease,crop_type,severity,expected", CASES)
+def test_recommend_matches_golden(disease, crop_type, severity, expected):
+    assert recommend(disease, crop_type, severity) == expected
+
+
+@pytest.mark.parametrize("disease,crop_type,severity,expected", CASES)
+def test_recommend_by_class_id_matches_golden(disease, crop_type, severity, expected):
+    # The predict path passes the interned id from the model's LabelSet
+    assert recommend(disease, crop_type, severity, label_id(disease)) == expected
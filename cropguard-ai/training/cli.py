@@ -0,0 +1,74 @@
+"""
+CropGuard AI - Model training CLI
+
+Examples (from cropguard-ai/):
+    python -m training --config training/configs/default.json
+    python -m training --config training/configs/default.json --epochs 5 --precision bfloat16
+    python -m training --data-dir dataset --intra-op-threads 16 --inter-op-threads 2
+    python -m training --config training/configs/default.json --set shuffle_buffer=8192
+
+Multi-worker CPU training: start the same command on every node with
+TF_CONFIG describing the cluster (distribute "auto" picks it up), e.g.
+    TF_CONFIG='{"cluster": {"worker": ["node1:12345", "node2:12345"]},
+                "task": {"type": "worker", "index": 0}}' python -m training ...
+
+Re-running a command resumes its run directory (runs/<name>); --fresh
+starts over. Each run writes runs/<name>/report.json.
+"""
+
+import argparse
+import json
+import sys
+
+from .config import load_config
+
+
+def _parse_set(values):
+    overrides = {}
+    for item in values or ():
+        key, sep, raw = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects key=value, got {item!r}")
+        try:
+            overrides[key] = json.loads(raw)
+        except ValueError:
+            overrides[key] = raw
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m training", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="JSON run config (see training/configs/)")
+    parser.add_argument("--name")
+    parser.add_argument("--data-dir")
+    parser.add_argument("--epochs", type=int, help="frozen-backbone epochs")
+    parser.add_argument("--fine-tune-epochs", type=int)
+    parser.add_argument("--batch-size", type=int, help="per worker")
+    parser.add_argument("--image-size", type=int)
+    parser.add_argument("--output", help="where to save the trained .h5 model")
+    parser.add_argument("--run-dir")
+    parser.add_argument("--precision", choices=["auto", "float32", "bfloat16"])
+    parser.add_argument("--distribute", choices=["auto", "none", "multi_worker"])
+    parser.add_argument("--inter-op-threads", type=int)
+    parser.add_argument("--intra-op-threads", type=int)
+    parser.add_argument("--no-feature-cache", dest="feature_cache", action="store_const", const=False)
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="any config key (JSON value)")
+    parser.add_argument("--fresh", action="store_true", help="discard the run directory and start over")
+    args = parser.parse_args(argv)
+
+    overrides = {k: v for k, v in vars(args).items() if v is not None and k not in ("config", "set", "fresh")}
+    overrides.update(_parse_set(args.set))
+    try:
+        config = load_config(args.config, overrides)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    # Imported late so --help and config errors do not wait for TensorFlow
+    from .train import run
+    report = run(config, fresh=args.fresh)
+    return 0 if report["status"] == "done" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
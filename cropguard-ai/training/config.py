@@ -0,0 +1,69 @@
+"""
+CropGuard AI - Training run configuration
+
+A run is described by a JSON file (see training/configs/) layered over
+DEFAULTS, then by command-line overrides. Relative paths are resolved
+against the working directory, as the old training scripts did.
+"""
+
+import json
+
+DEFAULTS = {
+    "name": "default",
+    # Dataset: <data_dir>/<split>/<class>/*.jpg
+    "data_dir": "dataset",
+    "train_split": "train",
+    "val_split": "validation",
+    "test_split": "test",
+    "image_size": 224,
+    # Per worker; the global batch is batch_size x replicas
+    "batch_size": 32,
+    "epochs": 30,
+    "fine_tune_epochs": 10,
+    "learning_rate": 0.001,
+    "fine_tune_learning_rate": 1e-5,
+    # data.augment_batch() arguments, or null for data.DEFAULT_AUGMENT;
+    # rotation and shear in degrees, shift and zoom as fractions
+    "augment": None,
+    "shuffle_buffer": 4096,
+    "early_stopping_patience": 5,
+    "reduce_lr_patience": 3,
+    "weights": "imagenet",
+    "seed": None,
+    # Frozen phase from cached backbone features (single worker only)
+    "feature_cache": True,
+    "cache_dir": "cache",
+    "output": "model/crop_disease_model.h5",
+    # Checkpoints, resume state and report.json; {name} is substituted
+    "run_dir": "runs/{name}",
+    # auto | float32 | bfloat16 (auto: bfloat16 where the CPU has native support)
+    "precision": "auto",
+    # auto | none | multi_worker (auto: multi_worker when TF_CONFIG is set)
+    "distribute": "auto",
+    # 0 lets TensorFlow choose
+    "inter_op_threads": 0,
+    "intra_op_threads": 0
+}
+
+
+def load_config(path=None, overrides=None):
+    """
+    DEFAULTS, updated from the JSON file at path and then from overrides
+
+    Raises:
+        ValueError: unknown keys, which are almost always typos
+    """
+    config = dict(DEFAULTS)
+    layers = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            layers.append(json.load(f))
+    if overrides:
+        layers.append(overrides)
+    for layer in layers:
+        unknown = sorted(set(layer) - set(DEFAULTS))
+        if unknown:
+            raise ValueError(f"unknown training config keys: {', '.join(unknown)}")
+        config.update(layer)
+    config["run_dir"] = config["run_dir"].format(name=config["name"])
+    return config
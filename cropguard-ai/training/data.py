@@ -0,0 +1,221 @@
+"""
+CropGuard AI - tf.data input pipeline for training
+
+Replaces ImageDataGenerator.flow_from_directory: files are listed on a
+thread pool, decoded and resized on all cores, cached as uint8 tensors
+after the first epoch, augmented a whole batch at a time and prefetched
+so the model never waits on Python.
+
+    from training.data import load_split
+    train = load_split("dataset/train", training=True, cache_dir=".cache/tfdata")
+    model.fit(train.dataset, validation_data=..., epochs=...)
+
+Class order is the sorted sub-directory names, as with flow_from_directory,
+so existing class_names.txt files stay valid.
+"""
+
+import hashlib
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# The augmentation train_model.py used with ImageDataGenerator
+DEFAULT_AUGMENT = {
+    "rotation": 30.0,      # degrees, +/-
+    "shift": 0.2,          # fraction of width/height, +/-
+    "shear": 0.2,          # degrees, +/- (ImageDataGenerator's shear_range unit)
+    "zoom": 0.2,           # scale in [1 - zoom, 1 + zoom]
+    "horizontal_flip": True,
+    "vertical_flip": True
+}
+
+Split = namedtuple("Split", ["dataset", "class_names", "samples", "steps"])
+
+
+def list_files(directory, class_names=None, workers=16):
+    """
+    Image paths and integer labels under directory/<class>/
+
+    Class directories are scanned in parallel, which matters on network
+    filesystems with tens of thousands of files.
+
+    Returns:
+        (paths, labels, class_names); paths sorted within each class
+    """
+    if class_names is None:
+        class_names = sorted(e.name for e in os.scandir(directory) if e.is_dir())
+    if not class_names:
+        raise ValueError(f"no class directories under {directory}")
+
+    def scan(name):
+        root = os.path.join(directory, name)
+        found = []
+        for dirpath, _, files in os.walk(root, followlinks=True):
+            found.extend(os.path.join(dirpath, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        return sorted(found)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(class_names))) as pool:
+        per_class = list(pool.map(scan, class_names))
+    paths, labels = [], []
+    for label, found in enumerate(per_class):
+        paths.extend(found)
+        labels.extend([label] * len(found))
+    return paths, labels, list(class_names)
+
+
+def _decode(image_size):
+    def decode(path, label):
+        raw = tf.io.read_file(path)
+        img = tf.io.decode_image(raw, channels=3, expand_animations=False)
+        # Bicubic, like PIL's default in the serving path (services/preprocess.py)
+        img = tf.image.resize(img, image_size, method="bicubic")
+        # Kept as uint8 so the cache is a quarter of the float32 size
+        return tf.saturate_cast(tf.round(img), tf.uint8), label
+    return decode
+
+
+def _affine(batch_size, height, width, rotation, shift, shear, zoom):
+    """
+    Per-image output->input transforms for ImageProjectiveTransformV3
+
+    Rotation, shear, zoom (about the centre) and shift combined into one
+    matrix per image, so the whole batch is warped by a single op.
+    """
+    def uniform(limit, offset=0.0):
+        return tf.random.uniform([batch_size], offset - limit, offset + limit)
+
+    theta = uniform(math.radians(rotation))
+    phi = uniform(math.radians(shear))
+    zx = uniform(zoom, 1.0)
+    zy = uniform(zoom, 1.0)
+    tx = uniform(shift) * width
+    ty = uniform(shift) * height
+
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    shear_sin, shear_cos = tf.sin(phi), tf.cos(phi)
+    # M = R(theta) @ Shear(phi) @ diag(zx, zy)
+    a0 = cos * zx
+    a1 = (-cos * shear_sin - sin * shear_cos) * zy
+    b0 = sin * zx
+    b1 = (-sin * shear_sin + cos * shear_cos) * zy
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    a2 = cx - a0 * cx - a1 * cy + tx
+    b2 = cy - b0 * cx - b1 * cy + ty
+    zeros = tf.zeros([batch_size])
+    return tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+
+def augment_batch(images, rotation=0.0, shift=0.0, shear=0.0, zoom=0.0,
+                  horizontal_flip=False, vertical_flip=False):
+    """
+    Random affine warp and flips for a float32 (N, H, W, 3) batch
+
+    Equivalent in spirit to ImageDataGenerator's per-image transforms
+    with fill_mode="nearest", but vectorised over the batch. rotation and
+    shear are in degrees, shift and zoom are fractions, with the same
+    meaning as the generator's *_range arguments.
+    """
+    shape = tf.shape(images)
+    n, height, width = shape[0], shape[1], shape[2]
+    if rotation or shift or shear or zoom:
+        transforms = _affine(n, tf.cast(height, tf.float32), tf.cast(width, tf.float32),
+                             rotation, shift, shear, zoom)
+        images = tf.raw_ops.ImageProjectiveTransformV3(
+            images=images, transforms=transforms, output_shape=shape[1:3],
+            fill_value=0.0, interpolation="BILINEAR", fill_mode="NEAREST")
+    if horizontal_flip:
+        flip = tf.random.uniform([n, 1, 1, 1]) < 0.5
+        images = tf.where(flip, tf.reverse(images, axis=[2]), images)
+    if vertical_flip:
+        flip = tf.random.uniform([n, 1, 1, 1]) < 0.5
+        images = tf.where(flip, tf.reverse(images, axis=[1]), images)
+    return images
+
+
+def cache_path(cache_dir, directory, paths, image_size):
+    """Cache file keyed by the file list and size, so a changed dataset never reuses stale tensors"""
+    key = hashlib.sha1()
+    key.update(os.path.abspath(directory).encode("utf-8"))
+    key.update(repr(tuple(image_size)).encode("utf-8"))
+    for p in paths:
+        key.update(p.encode("utf-8"))
+    os.makedirs(cache_dir, exist_ok=True)
+    name = os.path.basename(os.path.normpath(directory))
+    return os.path.join(cache_dir, f"{name}-{image_size[0]}x{image_size[1]}-{key.hexdigest()[:12]}")
+
+
+def load_split(directory, image_size=(224, 224), batch_size=32, training=False, augment=None,
+               cache_dir=None, shuffle_buffer=4096, class_names=None, seed=None, one_hot=True):
+    """
+    Build the input pipeline for one dataset split
+
+    Args:
+        directory: Split root with one sub-directory per class
+        image_size: (height, width) fed to the model
+        batch_size: Images per batch
+        training: Shuffle the whole file list, reshuffle through the
+            buffer every epoch and augment (with DEFAULT_AUGMENT unless
+            augment says otherwise); validation/test keep file order
+        augment: dict of augment_batch() keyword arguments, or False
+        cache_dir: Directory for the decoded-image cache; None keeps
+            decoding every epoch. The cache is complete after one full
+            pass; an interrupted pass leaves a lock file to delete.
+        shuffle_buffer: Images in the shuffle buffer (training only)
+        class_names: Fixed class order, e.g. the training split's
+        seed: Seed for the file order and the shuffle buffer
+            (augmentation follows tf.random.set_seed)
+        one_hot: Labels as one-hot vectors (categorical_crossentropy)
+            instead of integer ids
+
+    Returns:
+        Split(dataset, class_names, samples, steps) where dataset yields
+        (float32 images in [0, 1], labels) batches
+    """
+    image_size = tuple(image_size)
+    paths, labels, class_names = list_files(directory, class_names)
+    if not paths:
+        raise ValueError(f"no images under {directory}")
+    num_classes = len(class_names)
+    # The cache is keyed by the listed files, not by the order they are read in
+    cache_file = cache_path(cache_dir, directory, paths, image_size) if cache_dir else None
+    if training:
+        # list_files is grouped by class and the buffer below only spans a few
+        # classes, so mix the whole split once, as flow_from_directory did
+        order = np.random.default_rng(seed).permutation(len(paths))
+        paths = [paths[i] for i in order]
+        labels = [labels[i] for i in order]
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, tf.constant(labels, tf.int32)))
+    ds = ds.map(_decode(image_size), num_parallel_calls=AUTOTUNE, deterministic=not training)
+    if cache_file:
+        ds = ds.cache(cache_file)
+    if training:
+        ds = ds.shuffle(min(shuffle_buffer, len(paths)), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size, num_parallel_calls=AUTOTUNE, deterministic=not training)
+
+    if augment is None:
+        augment = DEFAULT_AUGMENT if training else False
+    augment = dict(augment) if augment else None
+
+    def finish(images, label):
+        images = tf.cast(images, tf.float32) / 255.0
+        if augment:
+            images = augment_batch(images, **augment)
+        if one_hot:
+            label = tf.one_hot(label, num_classes)
+        return images, label
+
+    ds = ds.map(finish, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    ds = ds.prefetch(AUTOTUNE)
+
+    options = tf.data.Options()
+    options.deterministic = not training
+    ds = ds.with_options(options)
+    return Split(ds, class_names, len(paths), math.ceil(len(paths) / batch_size))
@@ -0,0 +1,157 @@
+"""
+CropGuard AI - Bottleneck feature cache for the frozen-backbone phase
+
+While the backbone is frozen its output never changes, so instead of
+running MobileNetV2 over every image every epoch, the pooled features are
+computed once, stored as memory-mapped .npy files, and the head is trained
+from those. Fine-tuning afterwards runs on raw images as before.
+
+    store = extract_features(base_model, "dataset/train", "cache/features")
+    fit_head(head, store, val_store, epochs=30)
+
+Augmentation cannot apply to cached features, so the frozen phase sees
+each training image un-augmented; fine-tuning still augments.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from .data import list_files, load_split, cache_path
+
+FeatureStore = namedtuple("FeatureStore", ["features", "labels", "class_names", "path"])
+
+
+def _store_path(cache_dir, directory, paths, image_size, base_model):
+    # The weights fingerprint keeps a re-trained or differently-initialised backbone from reusing stale features
+    fingerprint = hashlib.sha1()
+    for w in base_model.get_weights()[:8]:
+        fingerprint.update(np.ascontiguousarray(w).tobytes()[:4096])
+    key = f"{base_model.name}-{fingerprint.hexdigest()[:12]}"
+    return cache_path(os.path.join(cache_dir, key), directory, paths, image_size)
+
+
+def open_store(path):
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return FeatureStore(
+        np.load(os.path.join(path, "features.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "labels.npy"), mmap_mode="r"),
+        meta["class_names"],
+        path
+    )
+
+
+def extract_features(base_model, directory, cache_dir, image_size=(224, 224), batch_size=64,
+                     class_names=None, dtype="float32"):
+    """
+    Run the frozen backbone once over a split and store pooled features
+
+    Reuses an existing store for the same files, image size and backbone
+    weights. The store is written to a temporary directory and renamed
+    into place, so an interrupted run never leaves a partial store.
+
+    Returns:
+        FeatureStore with (N, feature_dim) features and (N,) integer labels,
+        both memory-mapped
+    """
+    image_size = tuple(image_size)
+    paths, _, class_names = list_files(directory, class_names)
+    path = _store_path(cache_dir, directory, paths, image_size, base_model)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        print(f"   Using cached features: {path}")
+        return open_store(path)
+
+    split = load_split(directory, image_size=image_size, batch_size=batch_size,
+                       class_names=class_names, augment=False, one_hot=False)
+    extractor = keras.Sequential([base_model, keras.layers.GlobalAveragePooling2D()])
+    feature_dim = extractor.output_shape[-1]
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    features = np.lib.format.open_memmap(os.path.join(tmp, "features.npy"), mode="w+",
+                                         dtype=dtype, shape=(split.samples, feature_dim))
+    labels = np.lib.format.open_memmap(os.path.join(tmp, "labels.npy"), mode="w+",
+                                       dtype=np.int32, shape=(split.samples,))
+
+    @tf.function(reduce_retracing=True)
+    def forward(images):
+        return tf.cast(extractor(images, training=False), tf.float32)
+
+    started = time.perf_counter()
+    offset = 0
+    for images, batch_labels in split.dataset:
+        n = int(batch_labels.shape[0])
+        features[offset:offset + n] = forward(images).numpy()
+        labels[offset:offset + n] = batch_labels.numpy()
+        offset += n
+    features.flush()
+    labels.flush()
+    del features, labels
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"class_names": class_names, "samples": split.samples, "directory": os.path.abspath(directory),
+                   "image_size": list(image_size), "extract_s": round(time.perf_counter() - started, 2)}, f)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Another run finished the same store first
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"   Extracted {split.samples} feature vectors in {time.perf_counter() - started:.1f}s")
+    return open_store(path)
+
+
+def feature_dataset(store, batch_size=256, training=False, seed=None):
+    """
+    Batches of (features, one-hot labels) read from the memory-mapped store
+
+    Training batches are drawn in a new random order every epoch; indices
+    within a batch are sorted so reads stay mostly sequential.
+    """
+    n, dim = store.features.shape
+    num_classes = len(store.class_names)
+    rng = np.random.default_rng(seed)
+
+    def batches():
+        order = rng.permutation(n) if training else np.arange(n)
+        for i in range(0, n, batch_size):
+            idx = np.sort(order[i:i + batch_size])
+            yield np.asarray(store.features[idx], dtype=np.float32), np.asarray(store.labels[idx])
+
+    ds = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec((None, dim), tf.float32),
+        tf.TensorSpec((None,), tf.int32)
+    ))
+    ds = ds.map(lambda x, y: (x, tf.one_hot(y, num_classes)), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def fit_head(head, train_store, val_store=None, epochs=10, batch_size=256, callbacks=None,
+             learning_rate=0.001, verbose=1):
+    """
+    Train the head alone on cached features
+
+    The head's layers are shared with the full model from build_model(),
+    so the full model holds the trained weights afterwards.
+    """
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    steps = math.ceil(train_store.features.shape[0] / batch_size)
+    return head.fit(
+        feature_dataset(train_store, batch_size, training=True).repeat(),
+        steps_per_epoch=steps,
+        epochs=epochs,
+        validation_data=feature_dataset(val_store, batch_size) if val_store is not None else None,
+        callbacks=callbacks,
+        verbose=verbose
+    )
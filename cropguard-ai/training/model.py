@@ -0,0 +1,44 @@
+"""
+CropGuard AI - Classifier architecture shared by the training scripts
+
+MobileNetV2 backbone, global average pooling and a small Dense head. The
+head is also available on its own so it can be trained from cached
+backbone features (training/features.py) and then fine-tuned in place.
+"""
+
+from tensorflow import keras
+from tensorflow.keras import layers
+
+
+def build_head(num_classes, feature_dim):
+    """Dense head on pooled backbone features"""
+    return keras.Sequential([
+        keras.Input(shape=(feature_dim,)),
+        layers.Dropout(0.3),
+        layers.Dense(256, activation='relu'),
+        layers.Dropout(0.5),
+        # float32 softmax even under a mixed precision policy
+        layers.Dense(num_classes, activation='softmax', dtype='float32')
+    ], name="head")
+
+
+def build_model(num_classes, image_size=224, weights='imagenet'):
+    """
+    Returns:
+        (model, base_model, head). model shares its layers with base_model
+        and head, so weights learned by either carry over.
+    """
+    base_model = keras.applications.MobileNetV2(
+        input_shape=(image_size, image_size, 3),
+        include_top=False,
+        weights=weights
+    )
+    # Frozen for the first phase
+    base_model.trainable = False
+    head = build_head(num_classes, base_model.output_shape[-1])
+    model = keras.Sequential([
+        base_model,
+        layers.GlobalAveragePooling2D(),
+        *head.layers
+    ])
+    return model, base_model, head
@@ -0,0 +1,101 @@
+"""
+CropGuard AI - Machine-readable training run report
+
+report.json in the run directory records the config, the runtime
+(TensorFlow version, threads, precision, workers), every epoch's wall
+time, throughput and metrics per phase, and the final evaluation. It is
+rewritten after every epoch, so an interrupted run still leaves one.
+"""
+
+import datetime
+import json
+import os
+import platform
+import time
+
+import tensorflow as tf
+from tensorflow import keras
+
+
+class RunReport:
+
+    def __init__(self, path, config, runtime, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.data = {
+            "name": config["name"],
+            "started_at": datetime.datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "status": "running",
+            "config": config,
+            "runtime": {
+                "tensorflow": tf.__version__,
+                "python": platform.python_version(),
+                "host": platform.node(),
+                "cpus": os.cpu_count(),
+                "threads": runtime["threads"],
+                "precision": runtime["precision"],
+                "workers": runtime["num_workers"],
+                "replicas": runtime["replicas"]
+            },
+            "dataset": {},
+            "phases": {},
+            "evaluation": {},
+            "total_s": None
+        }
+        if os.path.exists(path):
+            # Resumed run: keep the epochs already recorded
+            with open(path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+            self.data["phases"] = previous.get("phases", {})
+            self.data["resumed_from"] = previous.get("started_at")
+
+    def phase(self, name, samples, unit="images"):
+        """Callback that records each epoch of a fit() as phase name"""
+        record = self.data["phases"].setdefault(name, {"samples": samples, "unit": unit, "epochs": []})
+        return _EpochRecorder(self, record)
+
+    def set(self, section, **values):
+        self.data[section].update(values)
+        self.save()
+
+    def finish(self, status="done"):
+        self.data["status"] = status
+        self.data["finished_at"] = datetime.datetime.utcnow().isoformat()
+        self.data["total_s"] = round(time.perf_counter() - self.started, 2)
+        self.save()
+
+    def save(self):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+
+class _EpochRecorder(keras.callbacks.Callback):
+
+    def __init__(self, report, record):
+        super().__init__()
+        self.report = report
+        self.record = record
+        self._t0 = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._t0 = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._t0
+        entry = {"epoch": epoch + 1, "seconds": round(elapsed, 3),
+                 f"{self.record['unit']}_per_s": round(self.record["samples"] / elapsed, 1)}
+        for key, value in (logs or {}).items():
+            entry[key] = float(value)
+        lr = getattr(self.model.optimizer, "learning_rate", None)
+        if lr is not None:
+            entry["learning_rate"] = float(keras.ops.convert_to_numpy(lr))
+        # A resumed fit() can repeat the epoch that was interrupted
+        self.record["epochs"] = [e for e in self.record["epochs"] if e["epoch"] != entry["epoch"]] + [entry]
+        self.report.save()
@@ -0,0 +1,91 @@
+"""
+CropGuard AI - TensorFlow runtime setup for training
+
+Thread pools, numeric precision and the distribution strategy. Thread
+settings only take effect before TensorFlow runs its first op, so
+configure() must be called before any dataset or model is built.
+"""
+
+import json
+import os
+
+import tensorflow as tf
+from tensorflow import keras
+
+
+def bf16_supported():
+    """True when the CPU has native bfloat16 arithmetic (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def configure_threads(inter_op, intra_op):
+    try:
+        if inter_op:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter_op))
+        if intra_op:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra_op))
+    except RuntimeError as e:
+        print(f"WARNING: thread settings ignored, TensorFlow is already initialised ({e})")
+    return {
+        "inter_op": tf.config.threading.get_inter_op_parallelism_threads(),
+        "intra_op": tf.config.threading.get_intra_op_parallelism_threads()
+    }
+
+
+def configure_precision(mode):
+    """Set the global Keras dtype policy; returns its name"""
+    if mode == "auto":
+        mode = "bfloat16" if bf16_supported() else "float32"
+    if mode == "bfloat16":
+        keras.mixed_precision.set_global_policy("mixed_bfloat16")
+    elif mode == "float32":
+        keras.mixed_precision.set_global_policy("float32")
+    else:
+        raise ValueError(f"precision must be auto, float32 or bfloat16, not {mode!r}")
+    return keras.mixed_precision.global_policy().name
+
+
+def make_strategy(mode):
+    """
+    Returns:
+        (strategy, is_chief, num_workers)
+    """
+    if mode == "auto":
+        mode = "multi_worker" if os.environ.get("TF_CONFIG") else "none"
+    if mode == "none":
+        return tf.distribute.get_strategy(), True, 1
+    if mode != "multi_worker":
+        raise ValueError(f"distribute must be auto, none or multi_worker, not {mode!r}")
+    # Workers find each other through TF_CONFIG; CPU collectives go over gRPC/RING
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING))
+    cluster = json.loads(os.environ.get("TF_CONFIG", "{}"))
+    task = cluster.get("task", {})
+    workers = cluster.get("cluster", {})
+    num_workers = len(workers.get("worker", [])) + len(workers.get("chief", []))
+    has_chief = bool(workers.get("chief"))
+    is_chief = task.get("type") == "chief" or (not has_chief and task.get("index", 0) == 0)
+    return strategy, is_chief, max(1, num_workers)
+
+
+def configure(config):
+    """Apply a run config's runtime settings; returns what was applied, for the report"""
+    if config["seed"] is not None:
+        keras.utils.set_random_seed(int(config["seed"]))
+    threads = configure_threads(config["inter_op_threads"], config["intra_op_threads"])
+    precision = configure_precision(config["precision"])
+    strategy, is_chief, num_workers = make_strategy(config["distribute"])
+    return {
+        "strategy": strategy,
+        "is_chief": is_chief,
+        "num_workers": num_workers,
+        "replicas": strategy.num_replicas_in_sync,
+        "threads": threads,
+        "precision": precision
+    }
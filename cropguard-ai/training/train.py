@@ -0,0 +1,196 @@
+"""
+CropGuard AI - Training run
+
+Two phases, as in the original scripts: the head is trained on a frozen
+MobileNetV2 (from cached backbone features when running on one worker),
+then the whole network is fine-tuned at a low learning rate. Each phase
+is resumable: Keras BackupAndRestore covers an interrupted fit(), and
+the weights of every finished phase are kept in the run directory so a
+restarted run skips it.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import tensorflow as tf
+from tensorflow import keras
+
+from .data import load_split
+from .features import extract_features, fit_head
+from .model import build_model
+from .report import RunReport
+from .runtime import configure
+
+PHASES = ("frozen", "fine_tune")
+# A run directory can only be resumed by a run over the same data and model
+RESUME_KEYS = ("data_dir", "train_split", "image_size", "weights")
+
+
+def _load_state(run_dir, config):
+    path = os.path.join(run_dir, "state.json")
+    if not os.path.exists(path):
+        return {"completed": [], "config": {k: config[k] for k in RESUME_KEYS}}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    changed = [k for k in RESUME_KEYS if state["config"].get(k) != config[k]]
+    if changed:
+        raise ValueError(f"{run_dir} belongs to a run with different {', '.join(changed)}; "
+                         "use --fresh or another --name")
+    return state
+
+
+def _save_state(run_dir, state):
+    tmp = os.path.join(run_dir, "state.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(run_dir, "state.json"))
+
+
+def _compile(model, learning_rate):
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+
+def _callbacks(config, run_dir, phase, is_chief, checkpoint=True):
+    callbacks = [
+        # Stop if validation loss doesn't improve
+        keras.callbacks.EarlyStopping(monitor='val_loss', patience=config["early_stopping_patience"],
+                                      restore_best_weights=True, verbose=1),
+        # Reduce learning rate if stuck
+        keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=config["reduce_lr_patience"],
+                                          min_lr=1e-7, verbose=1),
+        # Resume an interrupted fit() at the last finished epoch
+        keras.callbacks.BackupAndRestore(os.path.join(run_dir, "backup", phase))
+    ]
+    if checkpoint and is_chief:
+        callbacks.append(keras.callbacks.ModelCheckpoint(os.path.join(run_dir, "best_checkpoint.h5"),
+                                                         monitor='val_accuracy', save_best_only=True, verbose=1))
+    return callbacks
+
+
+def _shard(dataset, num_workers):
+    if num_workers > 1:
+        # Files come from one tensor, so shard by element rather than by file
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+        dataset = dataset.with_options(options)
+    return dataset
+
+
+def _save_model(model, config, runtime, class_names):
+    """Save a float32 copy of the model plus class_names.txt next to it"""
+    output = config["output"]
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    if runtime["precision"] != "float32":
+        # Serving hosts may lack bfloat16 support; store plain float32 weights
+        keras.mixed_precision.set_global_policy("float32")
+        plain, _, _ = build_model(len(class_names), config["image_size"], weights=None)
+        plain.set_weights(model.get_weights())
+        model = plain
+    model.save(output)
+    with open(os.path.join(os.path.dirname(output) or ".", "class_names.txt"), "w") as f:
+        for class_name in class_names:
+            f.write(f"{class_name}\n")
+
+
+def run(config, fresh=False):
+    """
+    Train, save and evaluate one model as described by config (see
+    training.config); returns the report dictionary
+    """
+    # Must run before TensorFlow executes anything
+    runtime = configure(config)
+    strategy, is_chief, num_workers = runtime["strategy"], runtime["is_chief"], runtime["num_workers"]
+    run_dir = config["run_dir"]
+    if fresh and is_chief and os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir, exist_ok=True)
+    state = _load_state(run_dir, config)
+    report = RunReport(os.path.join(run_dir, "report.json"), config, runtime, enabled=is_chief)
+
+    size = (config["image_size"], config["image_size"])
+    batch_size = config["batch_size"] * runtime["replicas"]
+    tfdata_cache = os.path.join(config["cache_dir"], "tfdata")
+    print(f"Run {config['name']}: {runtime['precision']}, {num_workers} worker(s), "
+          f"threads {runtime['threads']}, global batch {batch_size}, run dir {run_dir}")
+
+    train = load_split(os.path.join(config["data_dir"], config["train_split"]), image_size=size,
+                       batch_size=batch_size, training=True, augment=config["augment"],
+                       cache_dir=tfdata_cache, shuffle_buffer=config["shuffle_buffer"], seed=config["seed"])
+    val = load_split(os.path.join(config["data_dir"], config["val_split"]), image_size=size,
+                     batch_size=batch_size, class_names=train.class_names, cache_dir=tfdata_cache)
+    class_names = train.class_names
+    report.set("dataset", classes=len(class_names), train_samples=train.samples, val_samples=val.samples)
+    print(f"{len(class_names)} classes, {train.samples} training / {val.samples} validation images")
+
+    with strategy.scope():
+        model, base_model, head = build_model(len(class_names), config["image_size"], weights=config["weights"])
+        _compile(model, config["learning_rate"])
+
+    # Phase one: head on the frozen backbone
+    frozen_weights = os.path.join(run_dir, "frozen.weights.h5")
+    if "frozen" in state["completed"]:
+        print("Frozen phase already done, loading its weights")
+        model.load_weights(frozen_weights)
+    elif config["epochs"] > 0:
+        if config["feature_cache"] and num_workers == 1 and runtime["replicas"] == 1:
+            features_dir = os.path.join(config["cache_dir"], "features")
+            started = time.perf_counter()
+            train_features = extract_features(base_model, os.path.join(config["data_dir"], config["train_split"]),
+                                              features_dir, image_size=size, class_names=class_names)
+            val_features = extract_features(base_model, os.path.join(config["data_dir"], config["val_split"]),
+                                            features_dir, image_size=size, class_names=class_names)
+            report.set("phases", feature_extraction={"seconds": round(time.perf_counter() - started, 2)})
+            callbacks = _callbacks(config, run_dir, "frozen", is_chief, checkpoint=False)
+            callbacks.append(report.phase("frozen", train.samples, unit="features"))
+            fit_head(head, train_features, val_features, epochs=config["epochs"], callbacks=callbacks,
+                     learning_rate=config["learning_rate"])
+        else:
+            callbacks = _callbacks(config, run_dir, "frozen", is_chief)
+            callbacks.append(report.phase("frozen", train.samples))
+            model.fit(_shard(train.dataset, num_workers), epochs=config["epochs"],
+                      validation_data=_shard(val.dataset, num_workers), callbacks=callbacks, verbose=1)
+        model.save_weights(frozen_weights)
+        state["completed"].append("frozen")
+        _save_state(run_dir, state)
+
+    # Phase two: fine-tune everything at a low learning rate
+    fine_weights = os.path.join(run_dir, "fine_tune.weights.h5")
+    if "fine_tune" in state["completed"]:
+        print("Fine-tuning already done, loading its weights")
+        base_model.trainable = True
+        model.load_weights(fine_weights)
+    elif config["fine_tune_epochs"] > 0:
+        base_model.trainable = True
+        with strategy.scope():
+            _compile(model, config["fine_tune_learning_rate"])
+        callbacks = _callbacks(config, run_dir, "fine_tune", is_chief)
+        callbacks.append(report.phase("fine_tune", train.samples))
+        model.fit(_shard(train.dataset, num_workers), epochs=config["fine_tune_epochs"],
+                  validation_data=_shard(val.dataset, num_workers), callbacks=callbacks, verbose=1)
+        model.save_weights(fine_weights)
+        state["completed"].append("fine_tune")
+        _save_state(run_dir, state)
+
+    # Evaluation
+    val_loss, val_accuracy = model.evaluate(_shard(val.dataset, num_workers), verbose=1)
+    evaluation = {"val_loss": float(val_loss), "val_accuracy": float(val_accuracy)}
+    test_dir = os.path.join(config["data_dir"], config["test_split"]) if config["test_split"] else None
+    if test_dir and os.path.isdir(test_dir):
+        test = load_split(test_dir, image_size=size, batch_size=batch_size, class_names=class_names)
+        test_loss, test_accuracy = model.evaluate(_shard(test.dataset, num_workers), verbose=1)
+        evaluation.update(test_loss=float(test_loss), test_accuracy=float(test_accuracy))
+    report.set("evaluation", **evaluation)
+    print(f"Validation accuracy: {val_accuracy * 100:.2f}%  loss: {val_loss:.4f}")
+
+    if is_chief:
+        _save_model(model, config, runtime, class_names)
+        report.data["output"] = config["output"]
+        print(f"Model saved to {config['output']}, report in {report.path}")
+    report.finish()
+    return report.data